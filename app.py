@@ -1,49 +1,77 @@
 import os
 import re
-import requests
-from flask import Flask, render_template, request, flash, redirect, session, g
-from flask_debugtoolbar import DebugToolbarExtension
+import click
+from flask import Blueprint, Flask, render_template, request, flash, redirect, session, g, abort, send_file, has_request_context, jsonify, current_app, make_response
+from flask.ctx import _AppCtxGlobals
+from markupsafe import Markup
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 
+from config import configs
 from forms import AddNewUserForm, EditUserForm, LoginForm, CommentForm, EditCommentForm
-from models import db, connect_db, User, Comment, Pokemon
-from flask_bcrypt import Bcrypt
+from models import db, connect_db, User, Comment, Pokemon, Pokedex, ActivityFeedEntry
+import metrics
+import passwords
+import pokeapi
+from cache import TTLCache
+import responses
+import search
+import sprites
+from warmer import CacheWarmer
+from records import PokemonRecord
 
 CURR_USER_KEY = "curr_user"
 
-app = Flask(__name__)
+# every route lives on this blueprint, create_app() below builds the actual application around it.
+views = Blueprint('views', __name__)
 
-uri = os.environ.get('DATABASE_URL', 'postgresql:///pokeapi_db')
-if uri.startswith("postgres://"):
-    uri = uri.replace("postgres://", "postgresql://", 1)
 
+##############################################################################
+# User signup/login/logout
 
-# Get DB_URI from environ variable (useful for production/testing) or,
-# if not set there, use development local db.
-app.config['SQLALCHEMY_DATABASE_URI'] = uri
 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ECHO'] = False
-app.config['DEBUG_TB_INTERCEPT_REDIRECTS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', "it's a secret")
-toolbar = DebugToolbarExtension(app)
+# column values for recently seen users keyed by id, so most requests can build g.user without a query. Entries are dropped when the user edits or deletes their profile in this worker, the short ttl covers edits made through other workers.
+user_cache = TTLCache(max_size=1024, ttl=30)
 
-connect_db(app)
 
+def load_session_user():
+    """returns the logged in user (or None), preferring the cached column values over a query."""
 
-##############################################################################
-# User signup/login/logout
+    user_id = session.get(CURR_USER_KEY)
 
+    if user_id is None:
+        return None
 
-@app.before_request
-def add_user_to_g():
-    """If we're logged in, add curr user to Flask global."""
+    values = user_cache.get(user_id)
 
-    if CURR_USER_KEY in session:
-        g.user = User.query.get(session[CURR_USER_KEY])
+    if values is not None:
+        return User.from_snapshot(values)
 
-    else:
-        g.user = None
+    user = User.query.get(user_id)
+
+    if user is not None:
+        user_cache.set(user_id, user.snapshot())
+
+    return user
+
+
+class LazyUserGlobals(_AppCtxGlobals):
+    """Flask global object that only loads `g.user` the first time a view or template reads it."""
+
+    def __getattr__(self, name):
+        if name == 'user' and has_request_context():
+            self.user = load_session_user()
+            return self.user
+
+        raise AttributeError(name)
+
+
+@views.before_app_request
+def add_user_to_g():
+    """If we're logged in, curr user gets added to Flask global the first time it is used."""
+
+    # clearing any user left over from a previous request in the same app context.
+    g.pop('user', None)
 
 
 def do_login(user):
@@ -58,7 +86,7 @@ def do_logout():
     if CURR_USER_KEY in session:
         del session[CURR_USER_KEY]
 
-@app.route('/signup', methods=["GET", "POST"])
+@views.route('/signup', methods=["GET", "POST"])
 def signup():
     """Handle user signup.
 
@@ -95,7 +123,7 @@ def signup():
         return render_template('users/signup.html', form=form)
 
 
-@app.route('/login', methods=["GET", "POST"])
+@views.route('/login', methods=["GET", "POST"])
 def login():
     """Handle user login."""
 
@@ -115,7 +143,7 @@ def login():
     return render_template('users/login.html', form=form)
 
 
-@app.route('/logout')
+@views.route('/logout')
 def logout():
     """Handle logout of user."""
 
@@ -127,7 +155,8 @@ def logout():
 # USER ROUTES
 ########################################################################################
 
-@app.route('/')
+@views.route('/')
+@responses.conditional()
 def home():
     """if the user is not logged in, we will show the main landing page otherwise, users will be redirected to the 'pokedex-generations' route."""
 
@@ -137,7 +166,7 @@ def home():
     return redirect('/pokedex-generations')
 
 
-@app.route('/users/<int:user_id>')
+@views.route('/users/<int:user_id>')
 def profile_view(user_id):
     """function is responsible for displaying a user's profile including the comments that the user has posted."""
 
@@ -145,14 +174,14 @@ def profile_view(user_id):
         flash('Access unauthorized.', 'danger')
         return redirect('/')
 
-    user = User.query.get_or_404(user_id)
+    # populate_existing so viewing your own profile shows the current counters rather than the cached g.user copy.
+    user = User.query.populate_existing().get_or_404(user_id)
 
-    comments = (Comment.query.filter(Comment.user_id == user_id).order_by(
-        Comment.timestamp.desc()).limit(20).all())
+    comments, next_cursor = user.comments_page(before=Comment.parse_cursor(request.args.get('before')))
 
-    return render_template('users/profile-detail.html', user=user, comments=comments)
+    return render_template('users/profile-detail.html', user=user, comments=comments, next_cursor=next_cursor, top_pokemon=user.top_pokemon())
 
-@app.route('/users/edit', methods=['GET', 'POST'])
+@views.route('/users/edit', methods=['GET', 'POST'])
 def edit_profile():
     """function is responsible for showing the edit form and handling the data that is submitted to backend server. This route also checks to ensure that a user is actually authenticated prior to displaying the edit form."""
 
@@ -160,20 +189,14 @@ def edit_profile():
         flash('Access unauthorized.', 'danger')
         return redirect('/')
 
-    current_user = User.query.get(session[CURR_USER_KEY])
-
-    if g.user.id != current_user.id:
-        flash('Access unauthorized.', 'danger')
-        return redirect('/')
-
-    bcrypt = Bcrypt()
+    current_user = g.user
 
     form = EditUserForm(obj=current_user)
 
     password = form.password.data
 
     if form.validate_on_submit():
-        if not bcrypt.check_password_hash(current_user.password, password):
+        if not passwords.check_password(current_user.password, password):
             flash('Incorrect Password!', 'danger')
             return redirect(f'/users/{current_user.id}')
 
@@ -188,11 +211,12 @@ def edit_profile():
 
             db.session.add(current_user)
             db.session.commit()
+            user_cache.delete(current_user.id)
             return redirect(f'/users/{current_user.id}')
 
     return render_template('users/edit-profile.html', user=current_user, form=form)
 
-@app.route('/users/delete', methods=["POST"])
+@views.route('/users/delete', methods=["POST"])
 def delete_user():
     """Delete user."""
 
@@ -207,10 +231,13 @@ def delete_user():
     #     flash('Access unauthorized.', 'danger')
     #     return redirect('/')
 
+    user_id = g.user.id
+
     do_logout()
 
     db.session.delete(g.user)
     db.session.commit()
+    user_cache.delete(user_id)
 
     flash('User profile deleted.', 'info')
     return redirect("/signup")
@@ -220,7 +247,7 @@ def delete_user():
 # COMMENT ROUTES
 ########################################################################################
 
-@app.route('/pokemon/<pokemon_name>/add-comment', methods=['GET', 'POST'])
+@views.route('/pokemon/<pokemon_name>/add-comment', methods=['GET', 'POST'])
 def add_pokemon_comment(pokemon_name):
     """
     route will show form for adding a new comment to a pokemon and handle data received from front end and saves to the backend
@@ -234,20 +261,40 @@ def add_pokemon_comment(pokemon_name):
 
     form = CommentForm()
 
-    pokemon = Pokemon.query.filter(Pokemon.pokemon_name == pokemon_name).one()
+    pokemon = get_pokemon_or_404(pokemon_name)
 
     if form.validate_on_submit():
         new_comment = Comment(text=form.comment.data, user_id=g.user.id, pokemon_id=pokemon.id)
-        g.user.comments.append(new_comment)
         db.session.add(new_comment)
         db.session.commit()
+        # so the author sees their comment on /feed straight away, other workers catch up within the fragment's ttl.
+        responses.fragment_cache.delete('feed')
         flash('Message added successfully!', 'success')
         return redirect(f'/pokemon/{pokemon_name}/detail')
 
     return render_template('comments/add-comment.html', form=form)
 
 
-@app.route('/comments/<int:comment_id>/edit', methods=['GET', 'POST'])
+@views.route('/feed')
+@responses.conditional(max_age=15)
+def activity_feed_view():
+    """function shows the newest comments across the whole site, paged with a cursor (?before=) like the profile and detail pages. The first page is what almost everyone asks for, so it is cached for a few seconds."""
+
+    before = Comment.parse_cursor(request.args.get('before'))
+
+    def load():
+        entries, next_cursor = ActivityFeedEntry.page(before=before)
+        return {'entries': entries, 'next_cursor': next_cursor}
+
+    if before is None:
+        feed_html = responses.render_fragment('feed', 'comments/_feed-entries.html', ttl=15, load=load)
+    else:
+        feed_html = Markup(render_template('comments/_feed-entries.html', **load()))
+
+    return render_template('comments/feed.html', feed_html=feed_html)
+
+
+@views.route('/comments/<int:comment_id>/edit', methods=['GET', 'POST'])
 def update_comment(comment_id):
     """
     function handles request to show edit form for previous comments and sends updated information to backend db. 
@@ -259,7 +306,7 @@ def update_comment(comment_id):
         flash("Access unauthorized.", "danger")
         return redirect("/signup")
 
-    current_user = User.query.get(session[CURR_USER_KEY])
+    current_user = g.user
 
     comment = Comment.query.get_or_404(comment_id)
 
@@ -280,7 +327,7 @@ def update_comment(comment_id):
 
     return render_template('users/edit-comment.html', user=current_user, form=form)
 
-@app.route('/comments/<int:comment_id>/delete', methods=['POST'])
+@views.route('/comments/<int:comment_id>/delete', methods=['POST'])
 def delete_comment(comment_id):
     """function handles request to have comments removed for the user who wrote the message ONLY. Users will not be able to remove comments from other users at this time."""
 
@@ -296,6 +343,7 @@ def delete_comment(comment_id):
     
     db.session.delete(comment)
     db.session.commit()
+    responses.fragment_cache.delete('feed')
 
     return redirect(f'/users/{g.user.id}')
 
@@ -304,78 +352,320 @@ def delete_comment(comment_id):
 # POKEMON ROUTES
 ########################################################################################
 
-@app.route('/pokedex-generations')
-def all_pokedexes_view():
-    """function is responsible for returning the html view for all the different pokemon generations."""
+# every pokemon name, so junk urls (typos, crawlers) are a 404 before they cost a query or a PokeAPI call.
+known_pokemon = search.KnownNames(Pokemon.all_names)
+
 
-    all_pokemon = Pokemon.query.all()
+def get_pokemon_or_404(pokemon_name):
+    """returns the Pokemon named pokemon_name, aborting with a 404 right away when it is not a known name."""
 
-    kanto = [p for p in all_pokemon if p.id < 152]
+    if pokemon_name not in known_pokemon:
+        abort(404)
 
-    johto = [p for p in all_pokemon if p.id >= 152 and p.id < 252]
+    return Pokemon.query.filter(Pokemon.pokemon_name == pokemon_name).first_or_404()
 
-    hoenn = [p for p in all_pokemon if p.id >= 252 and p.id < 387]
 
-    sinnoh = [p for p in all_pokemon if p.id >= 387 and p.id < 494]
+@event.listens_for(Pokemon, 'after_insert')
+@event.listens_for(Pokemon, 'after_update')
+@event.listens_for(Pokemon, 'after_delete')
+def clear_pokemon_caches(mapper, connection, target):
+    """the generations accordion, the search index and the known names only depend on the pokemon table, so they are dropped whenever a pokemon row is written from this process. Their ttls cover writes made by other processes (seed.py / ingest.py)."""
 
-    unova = [p for p in all_pokemon if p.id >=494 and p.id < 650]
+    responses.fragment_cache.delete('generations')
+    search_index.clear()
+    known_pokemon.clear()
 
-    kalos = [p for p in all_pokemon if p.id >= 650 and p.id < 722]
 
-    alola = [p for p in all_pokemon if p.id >= 722 and p.id < 810]
+@views.route('/pokedex-generations')
+@responses.conditional()
+def all_pokedexes_view():
+    """function is responsible for returning the html view for all the different pokemon generations."""
 
-    galar = [p for p in all_pokemon if p.id >= 810 and p.id <= 905]    
+    generations_html = responses.render_fragment('generations', 'users/_generations-accordion.html', ttl=60 * 60, load=lambda: {'generations': Pokemon.by_generation()})
 
-    return render_template('users/pokedex-generations.html',kanto=kanto, johto=johto, hoenn=hoenn, sinnoh=sinnoh, unova=unova, kalos=kalos, alola=alola, galar=galar)
+    return render_template('users/pokedex-generations.html', generations_html=generations_html)
 
-@app.route('/pokedex-generations/<name>')
+@views.route('/pokedex-generations/<name>')
+@responses.conditional()
 def pokedex_view(name):
     """function is responsible for returning the individual view for the pokedex selected."""
 
-    res = requests.get(f'https://pokeapi.co/api/v2/pokedex/{name}')
-    dex_name = res.json()['name']
-    all_pokemon = res.json()['pokemon_entries']
+    # pokedexes are stored by seed.py, so unknown names are a 404 without asking PokeAPI.
+    pokedex = Pokedex.query.filter(Pokedex.name == name).first_or_404()
+
+    pokemon_html = responses.render_fragment(f'pokedex:{name}', 'pokemon/_pokedex-entries.html', name=name,
+                                             load=lambda: {'entries': pokedex.entries()})
+
+    return render_template('pokemon/pokedex.html', pokemon_html=pokemon_html, name=name)
+
+
+@views.route('/trending')
+@responses.conditional()
+def trending_view():
+    """function is responsible for showing the pokemon with the most recent comment activity. Scores come from the pokemon_trending table, so this never reads the comments."""
 
-    return render_template('pokemon/pokedex.html', pokemon=all_pokemon, name=dex_name)
+    trending_html = responses.render_fragment('trending', 'pokemon/_trending.html', ttl=60, load=lambda: {'trending': Pokemon.trending()})
 
+    return render_template('pokemon/trending.html', trending_html=trending_html)
 
-@app.route('/pokemon/<pokemon_name>/detail')
+
+@views.route('/pokemon/<pokemon_name>/detail')
+@responses.conditional()
 def pokemon_detail_view(pokemon_name):
     """function is responsible for showing the detailed view for a specific pokemon."""
 
-    res = requests.get(
-        f'https://pokeapi.co/api/v2/pokemon/{pokemon_name}/')
-    
-    # contains the response object from the api call for the specific pokemon that a user is viewing.
-    pokemon_data = res.json()
-    
-    # contains the types for the pokemon that was requested from the API.
-    types = pokemon_data['types']
+    pokemon = get_pokemon_or_404(pokemon_name)
 
-    # contains the stat information (list) for a pokemon.
-    stats = pokemon_data['stats']
+    # comments are paged with a cursor (?before=) pointing at the last comment of the previous page.
+    comments, next_cursor = pokemon.comments_page(before=Comment.parse_cursor(request.args.get('before')))
 
-    # contains the pokemon's moves information (all available moves that the pokemon can learn)
-    moves = pokemon_data['moves']
+    degraded = False
 
-    # contains the pokemon's abilities.
-    abilities = pokemon_data['abilities']
+    # the pokemon data section is the same for everyone and cached on its own, only the comments are rendered per request.
+    try:
+        pokemon_html = responses.render_fragment(f'pokemon-data:{pokemon_name}', 'pokemon/_pokemon-data.html', name=pokemon_name,
+                                                 load=lambda: {'pokemon': get_pokemon_record(pokemon)})
+    except pokeapi.UpstreamUnavailable:
+        # PokeAPI is down and nothing is cached, comments and sprites still come from the database.
+        flash('Pokemon details are temporarily unavailable, please try again later.', 'warning')
+        pokemon_html = Markup(render_template('pokemon/_pokemon-data.html', name=pokemon_name, pokemon=PokemonRecord.unavailable(pokemon)))
+        degraded = True
+    except pokeapi.NotFound:
+        # PokeAPI has no /pokemon/ entry under this species name (deoxys, ...), the page still works without the details.
+        pokemon_html = Markup(render_template('pokemon/_pokemon-data.html', name=pokemon_name, pokemon=PokemonRecord.unavailable(pokemon)))
 
-    # contains base exp for pokemon.
-    base_xp = pokemon_data['base_experience']
+    response = make_response(render_template('pokemon/pokemon-details.html', name=pokemon_name, pokemon_html=pokemon_html, comments=comments, next_cursor=next_cursor))
 
-    # contains the sprite information for pokemon (both shiny and non-shiny)
-    front_default = pokemon_data['sprites']['front_default']
-    front_shiny = pokemon_data['sprites']['front_shiny']
+    if degraded:
+        # neither a proxy nor the browser should hold on to the page without details once PokeAPI is back.
+        response.cache_control.no_store = True
 
-    # all comments for pokemon user is viewing.
-    pokemon = Pokemon.query.filter(Pokemon.pokemon_name == pokemon_name).one()
-    
+    return response
+
+
+@views.route('/pokemon/<pokemon_name>/moves')
+def pokemon_moves_view(pokemon_name):
+    """returns the moves for a pokemon as json. The detail page only loads these when the moves section is opened since move-heavy pokemon have well over 100 of them."""
+
+    pokemon = get_pokemon_or_404(pokemon_name)
+
+    try:
+        record = get_pokemon_record(pokemon)
+    except pokeapi.UpstreamUnavailable:
+        return jsonify(name=pokemon_name, moves=[]), 503
+    except pokeapi.NotFound:
+        return jsonify(name=pokemon_name, moves=[]), 404
+
+    return jsonify(name=pokemon_name, moves=record.moves)
+
+
+def get_pokemon_record(pokemon):
+    """returns the compact record of everything the detail page shows for a pokemon. Records are cached by the PokeAPI client and built from the stored details when ingest.py has synced this pokemon, otherwise from the API."""
+
+    if not pokemon.details_synced_at:
+        return pokeapi.client.get_pokemon(pokemon.pokemon_name)
+
+    key = f'pokemon/{pokemon.pokemon_name}'
+    record = pokeapi.client.cache.get(key)
+
+    if record is None:
+        pokemon = Pokemon.query_with_details().populate_existing().filter(Pokemon.id == pokemon.id).one()
+        record = PokemonRecord.from_model(pokemon)
+        pokeapi.client.cache.set(key, record)
+
+    return PokemonRecord.from_json(record)
+
+SPRITE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+@views.app_template_filter('sprite_url')
+def sprite_url_filter(pokemon, variant='front_default'):
+    """template filter that returns the url to use for a pokemon's sprite, either the stored url or the local proxy route."""
+
+    if current_app.config['SPRITE_PROXY']:
+        return f'/sprites/{pokemon.id}/{variant}.png'
+
+    return pokemon.sprite_url(variant)
+
+
+@views.route('/sprites/<int:pokemon_id>/<variant>.png')
+def sprite_view(pokemon_id, variant):
+    """serves a pokemon sprite from the local sprite cache with long lived cache headers so browsers only ever download it once."""
 
-    return render_template('pokemon/pokemon-details.html', name=pokemon_name, pokemon_data=pokemon_data, types=types, comments=pokemon.comments, stats=stats, moves=moves, front_img=front_default, shiny_img=front_shiny, abilities=abilities, base_xp=base_xp)
+    if variant not in ('front_default', 'front_shiny'):
+        abort(404)
 
-@app.route('/about')
+    pokemon = Pokemon.query.get_or_404(pokemon_id)
+
+    try:
+        path = sprites.get_sprite_path(pokemon.id, variant, pokemon.sprite_url(variant))
+    except Exception:
+        abort(404)
+
+    response = send_file(path, mimetype='image/png', conditional=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = SPRITE_MAX_AGE
+    return response
+
+# name index for the typeahead search, built from the pokemon table the first time someone searches.
+search_index = search.SearchIndexHolder(Pokemon.search_entries)
+
+
+@views.route('/search')
+def search_view():
+    """typeahead endpoint that returns pokemon matching ?q= as json, optionally filtered by ?type= and ?generation=."""
+
+    results = search_index.get().search(
+        request.args.get('q', ''),
+        type=request.args.get('type') or None,
+        generation=request.args.get('generation', type=int),
+        limit=min(request.args.get('limit', 10, type=int), 50),
+    )
+
+    return jsonify(results=[{
+        'id': entry.id,
+        'name': entry.name,
+        'generation': entry.generation,
+        'types': entry.types,
+        'url': f'/pokemon/{entry.name}/detail',
+    } for entry in results])
+
+
+@views.route('/search/go')
+def search_redirect():
+    """submitting the navbar search box goes to the best match, or back to the generations page when nothing matches."""
+
+    results = search_index.get().search(request.args.get('q', ''), limit=1)
+
+    if not results:
+        flash('No Pokemon found with that name.', 'warning')
+        return redirect('/pokedex-generations')
+
+    return redirect(f'/pokemon/{results[0].name}/detail')
+
+
+@views.route('/about')
+@responses.conditional(max_age=60 * 60)
 def about():
     """returns information about the project overall."""
 
     return render_template('about.html')
+
+
+########################################################################################
+# CACHE WARMER
+########################################################################################
+
+def warm_pokemon(pokemon_name):
+    """loads the record for one pokemon into the PokeAPI cache unless a copy with more than `refresh_ahead` seconds left is already there. Returns True when something was loaded."""
+
+    client = pokeapi.client
+    key = f'pokemon/{pokemon_name}'
+    expires_in = client.cache.expires_in(key)
+
+    if expires_in is not None and expires_in >= client.refresh_ahead:
+        return False
+
+    pokemon = Pokemon.query.filter(Pokemon.pokemon_name == pokemon_name).first()
+
+    if pokemon is None:
+        return False
+
+    if pokemon.details_synced_at:
+        pokemon = Pokemon.query_with_details().populate_existing().filter(Pokemon.id == pokemon.id).one()
+        client.cache.set(key, PokemonRecord.from_model(pokemon))
+        return True
+
+    # refresh() instead of get_pokemon() so an entry that is cached but close to expiry is replaced too.
+    return client.refresh(key, PokemonRecord.from_api) is not None
+
+
+def init_cache_warmer(app):
+    """sets up the warmer for app. It starts with the first request instead of here so that with `gunicorn --preload` every worker starts its own thread after the fork."""
+
+    config = app.config
+    warmer = CacheWarmer(Pokemon.by_recent_activity, warm_pokemon,
+                         interval=config['CACHE_WARMER_INTERVAL'],
+                         limit=config['CACHE_WARMER_LIMIT'],
+                         concurrency=config['CACHE_WARMER_CONCURRENCY'],
+                         context=app.app_context,
+                         paused=lambda: pokeapi.client.breaker.state == 'open')
+
+    app.extensions['cache_warmer'] = warmer
+    app.before_first_request(warmer.start)
+    metrics.register_stats('cache_warmer', lambda: warmer.stats)
+
+    return warmer
+
+
+########################################################################################
+# METRICS
+########################################################################################
+
+def pokeapi_client_stats():
+    """PokeAPI client counters plus recent latency percentiles and whether the circuit breaker is open."""
+
+    client = pokeapi.client
+    values = dict(client.stats)
+    values.update({f'latency_{point}_seconds': seconds for point, seconds in client.latency.percentiles().items()})
+    values['breaker_open'] = client.breaker.state != 'closed'
+
+    if client.refresher is not None:
+        values.update({f'refresh_{key}': value for key, value in client.refresher.stats.items()})
+        values['refresh_pending'] = len(client.refresher)
+
+    return values
+
+
+metrics.register_stats('user_cache', lambda: user_cache.stats)
+metrics.register_stats('fragment_cache', lambda: responses.fragment_cache.stats)
+metrics.register_stats('pokeapi_cache', lambda: pokeapi.client.cache.stats)
+metrics.register_stats('pokeapi_client', pokeapi_client_stats)
+metrics.register_stats('bcrypt', lambda: {f'{operation}_{key}': value for operation, values in passwords.stats.items() for key, value in values.items()})
+
+
+########################################################################################
+# APPLICATION FACTORY
+########################################################################################
+
+def create_app(config=None):
+    """builds the application for `config`, which is a name from config.configs or a config class. Without one the APP_CONFIG environment variable is used, falling back to development when FLASK_ENV=development and production otherwise."""
+
+    if config is None:
+        config = os.environ.get('APP_CONFIG') or ('development' if os.environ.get('FLASK_ENV') == 'development' else 'production')
+
+    if isinstance(config, str):
+        config = configs[config]
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.app_ctx_globals_class = LazyUserGlobals
+
+    connect_db(app)
+
+    # the toolbar and alembic are slow to import and never needed by a web worker. Migrations are only set up for the `flask` command (flask db ...) and seed.py.
+    if app.config['DEBUG_TOOLBAR']:
+        from flask_debugtoolbar import DebugToolbarExtension
+        DebugToolbarExtension(app)
+
+    if click.get_current_context(silent=True) is not None:
+        init_migrations(app)
+
+    # registered first so the timings cover every other hook, including gzip.
+    metrics.init_app(app)
+    metrics.instrument_sqlalchemy()
+
+    app.after_request(responses.gzip_response)
+    app.register_blueprint(views)
+
+    if app.config['CACHE_WARMER']:
+        init_cache_warmer(app)
+
+    return app
+
+
+def init_migrations(app):
+    """adds Flask-Migrate to app so `flask db ...` and `flask_migrate.upgrade()` work."""
+
+    from flask_migrate import Migrate
+    return Migrate(app, db)
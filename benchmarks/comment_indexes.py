@@ -0,0 +1,101 @@
+"""benchmark for the composite comment indexes added in migration 14055a01b8dc.
+
+Builds a throwaway copy of the schema in BENCH_DATABASE_URL, fills it with 1M comments and prints the query plans (EXPLAIN ANALYZE) for the profile and pokemon detail queries before and after the indexes are created.
+
+    createdb pokeapi_bench
+    python benchmarks/comment_indexes.py
+    python benchmarks/comment_indexes.py --comments 5000000
+
+NOTE: the benchmark drops and recreates every table in the target database.
+"""
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db  # noqa: E402
+
+INDEXES = ['ix_comments_user_id_timestamp', 'ix_comments_pokemon_id_timestamp']
+
+QUERIES = {
+    'profile_view (latest 20 comments for a user)': """
+        SELECT * FROM comments WHERE user_id = 42
+        ORDER BY timestamp DESC LIMIT 20
+    """,
+    'pokemon_detail_view (first page of comments for a pokemon)': """
+        SELECT * FROM comments JOIN users ON users.id = comments.user_id
+        WHERE pokemon_id = 25
+        ORDER BY timestamp DESC, comments.id DESC LIMIT 21
+    """,
+    'pokemon_detail_view (deep page via keyset cursor)': """
+        SELECT * FROM comments JOIN users ON users.id = comments.user_id
+        WHERE pokemon_id = 25 AND (timestamp, comments.id) < (now() - interval '300 days', 1000000000)
+        ORDER BY timestamp DESC, comments.id DESC LIMIT 21
+    """,
+}
+
+
+def fill(conn, comments, users):
+    db.metadata.drop_all(conn)
+    db.metadata.create_all(conn)
+
+    for index in INDEXES:
+        conn.execute(text(f'DROP INDEX {index}'))
+
+    conn.execute(text("""
+        INSERT INTO pokemon (id, pokemon_name)
+        SELECT i, 'pokemon-' || i FROM generate_series(1, 905) AS i
+    """))
+    conn.execute(text("""
+        INSERT INTO users (id, email, username, password)
+        SELECT i, 'user' || i || '@example.com', 'user' || i, 'x' FROM generate_series(1, :users) AS i
+    """), users=users)
+    conn.execute(text("""
+        INSERT INTO comments (text, timestamp, user_id, pokemon_id)
+        SELECT 'comment ' || i,
+               now() - (random() * interval '365 days'),
+               1 + (random() * (:users - 1))::int,
+               1 + (random() * 904)::int
+        FROM generate_series(1, :comments) AS i
+    """), users=users, comments=comments)
+    conn.execute(text('ANALYZE'))
+
+
+def explain(conn, label):
+    print(f'\n{"=" * 80}\n{label}\n{"=" * 80}')
+
+    for name, query in QUERIES.items():
+        print(f'\n-- {name}')
+        for row in conn.execute(text(f'EXPLAIN ANALYZE {query}')):
+            print(row[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    args = parser.parse_args()
+
+    engine = create_engine(os.environ.get('BENCH_DATABASE_URL', 'postgresql:///pokeapi_bench'))
+
+    with engine.begin() as conn:
+        fill(conn, args.comments, args.users)
+
+    with engine.begin() as conn:
+        explain(conn, f'WITHOUT composite indexes ({args.comments} comments)')
+
+    with engine.begin() as conn:
+        for index in db.metadata.tables['comments'].indexes:
+            index.create(conn)
+        conn.execute(text('ANALYZE comments'))
+
+    with engine.begin() as conn:
+        explain(conn, f'WITH composite indexes ({args.comments} comments)')
+
+
+if __name__ == '__main__':
+    main()
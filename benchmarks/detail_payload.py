@@ -0,0 +1,94 @@
+"""benchmark for the compact pokemon record used by the detail page.
+
+Compares the full PokeAPI /pokemon/<name> json with the `PokemonRecord` built from it: memory held per cached pokemon and the time to serialize / deserialize it for the disk cache tier.
+
+    python benchmarks/detail_payload.py
+    python benchmarks/detail_payload.py --dump pokemon.json    # real responses, same format ingest.py reads
+
+Without --dump a synthetic response shaped like a move-heavy species (~100 moves, ~20 version group details each) is used.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import PokemonRecord  # noqa: E402
+
+
+def synthetic_pokemon(moves=100, versions=20):
+    """builds a response with the same structure (and roughly the same size) as PokeAPI's for a move-heavy species."""
+
+    ref = lambda name: {'name': name, 'url': f'https://pokeapi.co/api/v2/x/{name}/'}  # noqa: E731
+
+    return {
+        'id': 6,
+        'name': 'charizard',
+        'base_experience': 267,
+        'height': 17,
+        'weight': 905,
+        'abilities': [{'ability': ref('blaze'), 'is_hidden': False, 'slot': 1},
+                      {'ability': ref('solar-power'), 'is_hidden': True, 'slot': 3}],
+        'forms': [ref('charizard')],
+        'game_indices': [{'game_index': 180, 'version': ref(f'version-{i}')} for i in range(20)],
+        'held_items': [],
+        'moves': [{'move': ref(f'move-{m}'),
+                   'version_group_details': [{'level_learned_at': v, 'move_learn_method': ref('level-up'),
+                                              'version_group': ref(f'version-group-{v}')} for v in range(versions)]}
+                  for m in range(moves)],
+        'species': ref('charizard'),
+        'sprites': {'front_default': 'https://example.com/6.png', 'front_shiny': 'https://example.com/shiny/6.png',
+                    'other': {f'artwork-{i}': {'front_default': f'https://example.com/{i}/6.png'} for i in range(30)}},
+        'stats': [{'base_stat': 78 + i, 'effort': 0, 'stat': ref(name)}
+                  for i, name in enumerate(['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed'])],
+        'types': [{'slot': 1, 'type': ref('fire')}, {'slot': 2, 'type': ref('flying')}],
+    }
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = build()  # noqa: F841 (kept alive until the second snapshot)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+
+def report(label, data, number):
+    record = PokemonRecord.from_api(data)
+    raw_json = json.dumps(data)
+    record_json = json.dumps(record)
+
+    raw_memory = measure_memory(lambda: json.loads(raw_json))
+    record_memory = measure_memory(lambda: PokemonRecord.from_json(json.loads(record_json)))
+
+    raw_time = timeit.timeit(lambda: json.loads(json.dumps(data)), number=number) / number
+    record_time = timeit.timeit(lambda: PokemonRecord.from_json(json.loads(json.dumps(record))), number=number) / number
+
+    print(f'\n{label}')
+    print(f'  {"":22}{"full json":>14}{"record":>14}')
+    print(f'  {"serialized size":22}{len(raw_json):>12} B{len(record_json):>12} B')
+    print(f'  {"memory per entry":22}{raw_memory:>12} B{record_memory:>12} B')
+    print(f'  {"dump + load":22}{raw_time * 1e6:>11.0f} us{record_time * 1e6:>11.0f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dump', help='json list of PokeAPI /pokemon responses')
+    parser.add_argument('--number', type=int, default=200, help='iterations for the timing runs')
+    args = parser.parse_args()
+
+    if args.dump:
+        with open(args.dump) as f:
+            for data in sorted(json.load(f), key=lambda d: len(d['moves']), reverse=True)[:3]:
+                report(f'{data["name"]} ({len(data["moves"])} moves)', data, args.number)
+    else:
+        report('synthetic move-heavy pokemon (100 moves)', synthetic_pokemon(), args.number)
+
+
+if __name__ == '__main__':
+    main()
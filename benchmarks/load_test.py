@@ -0,0 +1,145 @@
+"""load test comparing sync and gevent gunicorn workers against a slow PokeAPI stand-in.
+
+Starts the local PokeAPI stub (serving the recorded responses in fixtures/) with an artificial delay on every response, runs the app under gunicorn with each worker class and fires concurrent requests at a pokemon detail page. The pokemon has no ingested details and the PokeAPI and fragment caches are turned off, so every request queries Postgres for the pokemon and its comments and then waits on the stub.
+
+    createdb pokeapi_bench
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --requests 400 --concurrency 100 --delay 0.5 --workers 2
+
+The schema and the national dex fixture are stored in BENCH_DATABASE_URL (default postgresql:///pokeapi_bench) first.
+
+NOTE: the benchmark drops and recreates every table in the target database.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from sqlalchemy import create_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models import Pokemon, db, generation_for  # noqa: E402
+from pokeapi_stub import FIXTURES_DIR, PokeAPIStub  # noqa: E402
+
+# has a recorded /pokemon/ response in fixtures/ and is never ingested here.
+POKEMON = 'charmander'
+
+
+def seed(database_url):
+    """builds a fresh schema with only the national dex in it, so the detail page knows the pokemon but has to ask PokeAPI for its details."""
+
+    with open(os.path.join(FIXTURES_DIR, 'pokedex', 'national.json')) as f:
+        entries = json.load(f)['pokemon_entries']
+
+    engine = create_engine(database_url)
+
+    with engine.begin() as conn:
+        db.metadata.drop_all(conn)
+        db.metadata.create_all(conn)
+
+        conn.execute(Pokemon.__table__.insert(), [{
+            'id': item['entry_number'],
+            'pokemon_name': item['pokemon_species']['name'],
+            'generation': generation_for(item['entry_number']),
+        } for item in entries])
+
+    engine.dispose()
+
+
+def wait_for(url, timeout=30):
+    """waits until url answers with a 200. Anything else (a 404 from a typo in the url, a 500 from a missing table, ...) would make every timing below meaningless."""
+
+    deadline = time.time() + timeout
+    status = None
+
+    while time.time() < deadline:
+        try:
+            status = requests.get(url, timeout=10).status_code
+            if status == 200:
+                return
+        except requests.RequestException:
+            pass
+
+        time.sleep(0.2)
+
+    raise RuntimeError(f'{url} did not come up (last status {status})')
+
+
+def run(worker_class, stub_url, database_url, args):
+    port = 8765
+    env = dict(
+        os.environ,
+        APP_CONFIG='production',
+        DATABASE_URL=database_url,
+        POKEAPI_URL=stub_url,
+        POKEAPI_CACHE_SIZE='0',
+        POKEAPI_REFRESH_WORKERS='0',
+        POKEAPI_POOL_SIZE=str(args.concurrency),
+        FRAGMENT_CACHE_SIZE='0',
+        WEB_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(args.workers),
+        WEB_WORKER_CONNECTIONS=str(args.concurrency),
+    )
+    server = subprocess.Popen(
+        ['gunicorn', 'app:create_app()', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=ROOT, env=env,
+    )
+
+    try:
+        url = f'http://127.0.0.1:{port}/pokemon/{POKEMON}/detail'
+        wait_for(url)
+
+        session = requests.Session()
+        session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+        def hit(_):
+            start = time.perf_counter()
+            res = session.get(url, timeout=120)
+            return res.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(hit, range(args.requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status != 200)
+
+    print(f'{worker_class:>6}: {args.requests / elapsed:7.1f} req/s  '
+          f'p50 {latencies[len(latencies) // 2] * 1000:7.0f}ms  '
+          f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.0f}ms  '
+          f'errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds the stub waits before every response')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL', 'postgresql:///pokeapi_bench')
+    seed(database_url)
+
+    with PokeAPIStub.from_fixtures(delay=args.delay) as stub:
+        print(f'{args.requests} requests, {args.concurrency} concurrent, {args.workers} workers, upstream delay {args.delay}s')
+        for worker_class in ('sync', 'gevent'):
+            run(worker_class, stub.url, database_url, args)
+
+        # with both caches off every request should have gone upstream.
+        print(f'PokeAPI calls: {stub.requests[f"pokemon/{POKEMON}"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""benchmark for the cost of the request metrics in metrics.py.
+
+Serves the same small page (one template render and a few simulated PokeAPI timings) from two apps, one plain and one with `metrics.init_app`, and reports the extra time per request. Exits non-zero when the overhead is above the budget.
+
+    python benchmarks/metrics_overhead.py
+    python benchmarks/metrics_overhead.py --requests 5000 --budget-us 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, render_template_string  # noqa: E402
+
+import metrics  # noqa: E402
+
+TEMPLATE = '<ul>{% for name in names %}<li>{{ name }}</li>{% endfor %}</ul>'
+NAMES = [f'pokemon-{i}' for i in range(50)]
+
+
+def make_app(instrumented):
+    app = Flask(__name__)
+
+    if instrumented:
+        app.config['SERVER_TIMING'] = True
+        metrics.init_app(app)
+
+    @app.route('/page')
+    def page():
+        for _ in range(3):
+            metrics.observe_pokeapi(0.001)
+        return render_template_string(TEMPLATE, names=NAMES)
+
+    return app
+
+
+def measure(apps, requests, rounds):
+    """returns the fastest seconds per request for each app. Rounds alternate between the apps so machine noise hits both equally."""
+
+    clients = [app.test_client() for app in apps]
+    best = [float('inf')] * len(apps)
+
+    for client in clients:
+        for _ in range(200):
+            client.get('/page')
+
+    for _ in range(rounds):
+        for i, client in enumerate(clients):
+            start = time.perf_counter()
+            for _ in range(requests):
+                client.get('/page')
+            best[i] = min(best[i], (time.perf_counter() - start) / requests)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--budget-us', type=float, default=50, help='allowed overhead per request in microseconds')
+    args = parser.parse_args()
+
+    plain, instrumented = measure([make_app(False), make_app(True)], args.requests, args.rounds)
+    overhead = (instrumented - plain) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        metrics.REQUEST_SECONDS.observe(0.012, 'page', 'GET', '200')
+    observe = (time.perf_counter() - start) / 100000 * 1e6
+
+    print(f'plain        {plain * 1e6:8.1f}us / request')
+    print(f'instrumented {instrumented * 1e6:8.1f}us / request')
+    print(f'overhead     {overhead:8.1f}us / request (budget {args.budget_us:.0f}us)')
+    print(f'histogram observe {observe:.2f}us')
+
+    if overhead > args.budget_us:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""benchmark for the /search typeahead index.
+
+Builds `PokemonSearchIndex` over synthetic name sets of increasing size and reports the build time, memory and per-query latency for prefix, substring and misspelled queries.
+
+    python benchmarks/search_latency.py
+    python benchmarks/search_latency.py --sizes 905 10000 100000 --queries 2000
+
+The real index holds one entry per row in the pokemon table (905 today); the bigger sizes show how it behaves if forms / regional variants are added.
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import PokemonSearchIndex, SearchEntry  # noqa: E402
+
+TYPES = ['normal', 'fire', 'water', 'grass', 'electric', 'ice', 'fighting', 'poison', 'ground',
+         'flying', 'psychic', 'bug', 'rock', 'ghost', 'dragon', 'dark', 'steel', 'fairy']
+
+SYLLABLES = ['char', 'man', 'der', 'pi', 'ka', 'chu', 'bul', 'ba', 'saur', 'squir', 'tle', 'mew',
+             'two', 'eev', 'ee', 'gar', 'dos', 'lu', 'gia', 'ra', 'ti', 'nos', 'zor', 'ua']
+
+
+def synthetic_entries(size, seed=0):
+    rng = random.Random(seed)
+    entries = []
+
+    for pokemon_id in range(1, size + 1):
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        entries.append(SearchEntry(pokemon_id, f'{name}-{pokemon_id}' if rng.random() < .5 else name,
+                                   pokemon_id % 9 + 1, tuple(rng.sample(TYPES, rng.randint(1, 2)))))
+
+    return entries
+
+
+def queries(entries, count, seed=1):
+    """mix of prefixes, substrings and names with one character changed."""
+
+    rng = random.Random(seed)
+    result = []
+
+    for _ in range(count):
+        name = rng.choice(entries).name
+        kind = rng.random()
+
+        if kind < .5:
+            result.append(name[:rng.randint(1, min(6, len(name)))])
+        elif kind < .75:
+            start = rng.randint(0, max(0, len(name) - 4))
+            result.append(name[start:start + 4])
+        else:
+            position = rng.randrange(len(name))
+            result.append(name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:])
+
+    return result
+
+
+def percentile(samples, point):
+    return samples[min(len(samples) - 1, len(samples) * point // 100)]
+
+
+def run(size, query_count):
+    entries = synthetic_entries(size)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = PokemonSearchIndex(entries)
+    build = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    samples = []
+    for query in queries(entries, query_count):
+        start = time.perf_counter()
+        index.search(query)
+        samples.append(time.perf_counter() - start)
+
+    filtered = []
+    for query in queries(entries, query_count // 4, seed=2):
+        start = time.perf_counter()
+        index.search(query, type='fire', generation=3)
+        filtered.append(time.perf_counter() - start)
+
+    samples.sort()
+    filtered.sort()
+
+    print(f'{size:>7} entries  build {build * 1000:8.1f}ms  memory {memory / 1024 / 1024:7.1f}MB  '
+          f'query p50 {percentile(samples, 50) * 1e6:7.0f}us  p99 {percentile(samples, 99) * 1e6:7.0f}us  '
+          f'filtered p99 {percentile(filtered, 99) * 1e6:7.0f}us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries)
+
+
+if __name__ == '__main__':
+    main()
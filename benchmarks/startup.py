@@ -0,0 +1,68 @@
+"""benchmark for how long a fresh worker takes to import the application and build it with create_app.
+
+Every sample runs in a new python process, the same as a gunicorn worker booting without --preload. The slowest imports of the production build are listed as well (python -X importtime).
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --configs production testing
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = '''
+import time
+start = time.perf_counter()
+from app import create_app
+create_app({config!r})
+print(time.perf_counter() - start)
+'''
+
+
+def boot(config):
+    result = subprocess.run([sys.executable, '-c', SNIPPET.format(config=config)], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(config, count):
+    """returns (cumulative microseconds, module) for the slowest top level imports."""
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', SNIPPET.format(config=config)], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    rows = []
+
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # nested imports are indented, only modules imported directly are listed.
+        if not name[1:].startswith(' '):
+            rows.append((int(cumulative), name.strip()))
+
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--configs', nargs='+', default=['production', 'development', 'testing'])
+    parser.add_argument('--imports', type=int, default=10, help='number of slowest imports to list')
+    args = parser.parse_args()
+
+    for config in args.configs:
+        samples = sorted(boot(config) for _ in range(args.runs))
+        print(f'{config:<12} median {statistics.median(samples) * 1000:7.1f}ms  min {samples[0] * 1000:7.1f}ms  max {samples[-1] * 1000:7.1f}ms')
+
+    print('\nslowest imports (production):')
+    for microseconds, name in slowest_imports('production', args.imports):
+        print(f'{microseconds / 1000:8.1f}ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""small read-through cache used to keep PokeAPI responses close to the app.
+
+The first tier is an in-process LRU with a TTL per entry. An optional second tier writes every entry to a directory on disk so that warm data survives gunicorn worker restarts (each worker still keeps its own memory tier)."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class DiskStore:
+    """stores cache entries as one json file per key inside a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def get(self, key):
+        """returns a (value, expires_at) tuple or None when the key is not on disk."""
+
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        return entry['value'], entry['expires_at']
+
+    def set(self, key, value, expires_at):
+        """writes the entry to a temp file first so readers never see a half written file."""
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'value': value, 'expires_at': expires_at}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class TTLCache:
+    """thread safe LRU cache where every entry also expires after `ttl` seconds.
+
+    When `disk_dir` is given, misses in memory fall through to the disk tier and every `set` is written to both tiers. Values stored with a disk tier must be json serializable.
+
+    Expired entries are not served by `get` but are kept around (until the LRU pushes them out) so `get_stale` can still return them when a fresh copy cannot be fetched."""
+
+    def __init__(self, max_size=1024, ttl=3600, disk_dir=None, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.disk = DiskStore(disk_dir) if disk_dir else None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'disk_hits': 0,
+            'evictions': 0,
+            'expirations': 0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        """returns the cached value for key or None on a miss."""
+
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+
+                self.stats['expirations'] += 1
+
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None and entry[1] > now:
+                with self._lock:
+                    self._store(key, entry[0], entry[1])
+                    self.stats['hits'] += 1
+                    self.stats['disk_hits'] += 1
+                return entry[0]
+
+        with self._lock:
+            self.stats['misses'] += 1
+
+        return None
+
+    def get_stale(self, key):
+        """returns the cached value for key even if it has expired, or None when nothing was ever cached."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+
+        return entry[0] if entry is not None else None
+
+    def expires_in(self, key):
+        """returns the seconds until the cached entry for key expires (negative once it has expired), or None when nothing is cached. Does not count as a hit or a miss."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+
+        return entry[1] - self.clock() if entry is not None else None
+
+    def set(self, key, value, ttl=None):
+        """adds value to the cache, evicting the least recently used entries once the cache is full."""
+
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._store(key, value, expires_at)
+
+        if self.disk is not None:
+            self.disk.set(key, value, expires_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        """empties the memory tier only, the disk tier is left alone."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, value, expires_at):
+        # caller must be holding self._lock
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
@@ -0,0 +1,74 @@
+"""settings for each environment the application runs in. `create_app` in app.py picks one by name:
+
+* `development` - local `flask run`, debug toolbar on.
+* `production` - gunicorn workers, nothing development only is imported.
+* `testing` - the test suite, separate database and no CSRF tokens.
+
+Values that differ per deployment still come from environment variables (see the Configuration section of the README)."""
+
+import os
+
+
+def env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def database_url(default):
+    uri = os.environ.get('DATABASE_URL', default)
+
+    # heroku still hands out postgres:// urls which SQLAlchemy no longer accepts.
+    if uri.startswith("postgres://"):
+        uri = uri.replace("postgres://", "postgresql://", 1)
+
+    return uri
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = database_url('postgresql:///pokeapi_db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+
+    SECRET_KEY = os.environ.get('SECRET_KEY', "it's a secret")
+
+    # when enabled, sprite images are served by the app from a local cache instead of linking straight to github.
+    SPRITE_PROXY = env_flag('SPRITE_PROXY')
+
+    SERVER_TIMING = env_flag('SERVER_TIMING')
+
+    # bearer token for /metrics. Without one the endpoint is open, unless METRICS_REQUIRE_TOKEN is set.
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_REQUIRE_TOKEN = False
+
+    # pre-fetches the most commented pokemon into the PokeAPI cache in the background, see warmer.py.
+    CACHE_WARMER = env_flag('CACHE_WARMER')
+    CACHE_WARMER_INTERVAL = int(os.environ.get('CACHE_WARMER_INTERVAL', 60 * 15))
+    CACHE_WARMER_LIMIT = int(os.environ.get('CACHE_WARMER_LIMIT', 200))
+    CACHE_WARMER_CONCURRENCY = int(os.environ.get('CACHE_WARMER_CONCURRENCY', 2))
+
+    # the toolbar is slow to import and only useful locally.
+    DEBUG_TOOLBAR = False
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    DEBUG_TOOLBAR = True
+    DEBUG_TB_INTERCEPT_REDIRECTS = False
+
+
+class ProductionConfig(Config):
+    # latency, query counts and breaker state are not for the public site, /metrics is a 404 until METRICS_TOKEN is set.
+    METRICS_REQUIRE_TOKEN = True
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'postgresql:///testing_db')
+    WTF_CSRF_ENABLED = False
+    CACHE_WARMER = False
+
+
+configs = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
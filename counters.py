@@ -0,0 +1,170 @@
+"""comment counters that are updated in the same transaction as the comment itself.
+
+* `users.comment_count` / `users.last_comment_at` and `user_pokemon_comment_counts` let the profile page show totals without counting or loading a user's whole comment history.
+* `pokemon.comment_count` / `pokemon.last_comment_at` do the same for each pokemon.
+* `pokemon_trending` keeps a time decayed score per pokemon for /trending: every comment adds 1 and the score halves every `TRENDING_HALF_LIFE` seconds. The score is stored together with the time it was last decayed to, so an update only touches one row and a read decays it to the current time.
+
+Every change is a single atomic UPDATE / upsert computed from the row's current values, so concurrent comments can not lose increments.
+
+The functions are called from the Comment and User mapper events in models.py with the flush's connection. Comments removed with bulk `Query.delete()` or raw SQL bypass those events, `rebuild` recomputes everything from the comments table when that happens."""
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+TRENDING_HALF_LIFE = 60 * 60 * 12
+
+# scores below this (a single comment from more than about three days ago, or what rounding leaves after removals) are not shown as trending.
+TRENDING_MIN_SCORE = 0.01
+
+# comments older than this many half lives add less than 0.1% to a score and are left out when one is rebuilt.
+TRENDING_WINDOW_HALF_LIVES = 10
+
+
+def decay(seconds_sql):
+    """SQL for the factor a score shrinks by over `seconds_sql` seconds. The exponent is capped because Postgres raises an underflow error rather than return 0 for tiny results."""
+
+    return f'power(0.5, LEAST(GREATEST(CAST({seconds_sql} AS float), 0) / {TRENDING_HALF_LIFE}, 64))'
+
+
+INCREMENT_USER = text('''
+    UPDATE users SET comment_count = comment_count + 1, last_comment_at = GREATEST(last_comment_at, :timestamp)
+    WHERE id = :user_id
+''')
+
+# last_comment_at is only looked up again when the removed comment was the latest one, which the (user_id, timestamp) index answers directly.
+DECREMENT_USER = text('''
+    UPDATE users SET
+        comment_count = GREATEST(comment_count - 1, 0),
+        last_comment_at = CASE WHEN last_comment_at > :timestamp THEN last_comment_at
+                               ELSE (SELECT max(comments.timestamp) FROM comments WHERE user_id = :user_id) END
+    WHERE id = :user_id
+''')
+
+INCREMENT_POKEMON = text('''
+    UPDATE pokemon SET comment_count = comment_count + 1, last_comment_at = GREATEST(last_comment_at, :timestamp)
+    WHERE id = :pokemon_id
+''')
+
+DECREMENT_POKEMON = text('''
+    UPDATE pokemon SET
+        comment_count = GREATEST(comment_count - 1, 0),
+        last_comment_at = CASE WHEN last_comment_at > :timestamp THEN last_comment_at
+                               ELSE (SELECT max(comments.timestamp) FROM comments WHERE pokemon_id = :pokemon_id) END
+    WHERE id = :pokemon_id
+''')
+
+# the stored score is decayed to :now before the comment's own (decayed) weight is added, and updated_at never moves backwards when transactions commit out of order.
+ADD_TRENDING = text(f'''
+    INSERT INTO pokemon_trending (pokemon_id, score, updated_at)
+    VALUES (:pokemon_id, {decay("EXTRACT(EPOCH FROM CAST(:now AS timestamp) - CAST(:timestamp AS timestamp))")}, :now)
+    ON CONFLICT (pokemon_id) DO UPDATE SET
+        score = pokemon_trending.score * {decay("EXTRACT(EPOCH FROM CAST(:now AS timestamp) - pokemon_trending.updated_at)")} + EXCLUDED.score,
+        updated_at = GREATEST(pokemon_trending.updated_at, EXCLUDED.updated_at)
+''')
+
+REMOVE_TRENDING = text(f'''
+    UPDATE pokemon_trending SET
+        score = GREATEST(score * {decay("EXTRACT(EPOCH FROM CAST(:now AS timestamp) - updated_at)")}
+                         - {decay("EXTRACT(EPOCH FROM CAST(:now AS timestamp) - CAST(:timestamp AS timestamp))")}, 0),
+        updated_at = GREATEST(updated_at, :now)
+    WHERE pokemon_id = :pokemon_id
+''')
+
+INCREMENT_USER_POKEMON = text('''
+    INSERT INTO user_pokemon_comment_counts (user_id, pokemon_id, comment_count)
+    VALUES (:user_id, :pokemon_id, 1)
+    ON CONFLICT (user_id, pokemon_id)
+    DO UPDATE SET comment_count = user_pokemon_comment_counts.comment_count + 1
+''')
+
+DECREMENT_USER_POKEMON = text('''
+    UPDATE user_pokemon_comment_counts SET comment_count = comment_count - 1
+    WHERE user_id = :user_id AND pokemon_id = :pokemon_id
+''')
+
+# a separate statement because Postgres does not let a DELETE touch rows that an UPDATE in the same statement (a data modifying CTE) already changed.
+DELETE_EMPTY_USER_POKEMON = text('''
+    DELETE FROM user_pokemon_comment_counts
+    WHERE user_id = :user_id AND pokemon_id = :pokemon_id AND comment_count <= 0
+''')
+
+# a deleted user's comments are removed by the foreign key cascade without any Comment events, so the pokemon side is adjusted for all of them at once before the user row goes. The per user / pokemon counts say how much to take off each pokemon.
+REMOVE_USER_FROM_POKEMON = text('''
+    UPDATE pokemon SET
+        comment_count = GREATEST(pokemon.comment_count - counts.comment_count, 0),
+        last_comment_at = (SELECT max(comments.timestamp) FROM comments WHERE pokemon_id = pokemon.id AND user_id <> :user_id)
+    FROM user_pokemon_comment_counts counts
+    WHERE counts.user_id = :user_id AND pokemon.id = counts.pokemon_id
+''')
+
+REMOVE_USER_FROM_TRENDING = text(f'''
+    UPDATE pokemon_trending SET
+        score = GREATEST(pokemon_trending.score * {decay("EXTRACT(EPOCH FROM CAST(:now AS timestamp) - pokemon_trending.updated_at)")} - weights.weight, 0),
+        updated_at = GREATEST(pokemon_trending.updated_at, :now)
+    FROM (
+        SELECT pokemon_id, sum({decay("EXTRACT(EPOCH FROM CAST(:now AS timestamp) - comments.timestamp)")}) AS weight
+        FROM comments
+        WHERE user_id = :user_id AND comments.timestamp >= CAST(:now AS timestamp) - make_interval(secs => :window)
+        GROUP BY pokemon_id
+    ) weights
+    WHERE pokemon_trending.pokemon_id = weights.pokemon_id
+''')
+
+
+def comment_added(connection, user_id, pokemon_id, timestamp):
+    connection.execute(INCREMENT_USER, user_id=user_id, timestamp=timestamp)
+    connection.execute(INCREMENT_USER_POKEMON, user_id=user_id, pokemon_id=pokemon_id)
+    connection.execute(INCREMENT_POKEMON, pokemon_id=pokemon_id, timestamp=timestamp)
+    connection.execute(ADD_TRENDING, pokemon_id=pokemon_id, timestamp=timestamp, now=datetime.utcnow())
+
+
+def comment_removed(connection, user_id, pokemon_id, timestamp):
+    connection.execute(DECREMENT_USER, user_id=user_id, timestamp=timestamp)
+    connection.execute(DECREMENT_USER_POKEMON, user_id=user_id, pokemon_id=pokemon_id)
+    connection.execute(DELETE_EMPTY_USER_POKEMON, user_id=user_id, pokemon_id=pokemon_id)
+    connection.execute(DECREMENT_POKEMON, pokemon_id=pokemon_id, timestamp=timestamp)
+    connection.execute(REMOVE_TRENDING, pokemon_id=pokemon_id, timestamp=timestamp, now=datetime.utcnow())
+
+
+def user_removed(connection, user_id):
+    """takes a user's comments off the pokemon counters and trending scores. Must run before the user (and with it their comments and per pokemon counts) is deleted."""
+
+    # pokemon rows are locked before pokemon_trending rows, the same order as comment_added / comment_removed, so a concurrent comment cannot deadlock with this.
+    connection.execute(REMOVE_USER_FROM_POKEMON, user_id=user_id)
+    connection.execute(REMOVE_USER_FROM_TRENDING, user_id=user_id, now=datetime.utcnow(),
+                       window=TRENDING_HALF_LIFE * TRENDING_WINDOW_HALF_LIVES)
+
+
+def rebuild(connection):
+    """recomputes every counter from the comments table."""
+
+    connection.execute(text('''
+        UPDATE users SET
+            comment_count = COALESCE((SELECT count(*) FROM comments WHERE comments.user_id = users.id), 0),
+            last_comment_at = (SELECT max(comments.timestamp) FROM comments WHERE comments.user_id = users.id)
+    '''))
+    connection.execute(text('''
+        UPDATE pokemon SET
+            comment_count = COALESCE((SELECT count(*) FROM comments WHERE comments.pokemon_id = pokemon.id), 0),
+            last_comment_at = (SELECT max(comments.timestamp) FROM comments WHERE comments.pokemon_id = pokemon.id)
+    '''))
+    connection.execute(text('DELETE FROM user_pokemon_comment_counts'))
+    connection.execute(text('''
+        INSERT INTO user_pokemon_comment_counts (user_id, pokemon_id, comment_count)
+        SELECT user_id, pokemon_id, count(*) FROM comments GROUP BY user_id, pokemon_id
+    '''))
+    rebuild_trending(connection)
+
+
+def rebuild_trending(connection):
+    """recomputes every trending score from the comments of the last TRENDING_WINDOW_HALF_LIVES half lives."""
+
+    connection.execute(text('DELETE FROM pokemon_trending'))
+    connection.execute(text(f'''
+        INSERT INTO pokemon_trending (pokemon_id, score, updated_at)
+        SELECT pokemon_id, sum({decay("EXTRACT(EPOCH FROM CAST(:now AS timestamp) - comments.timestamp)")}), :now
+        FROM comments
+        WHERE comments.timestamp >= CAST(:now AS timestamp) - make_interval(secs => :window)
+        GROUP BY pokemon_id
+    '''), now=datetime.utcnow(), window=TRENDING_HALF_LIFE * TRENDING_WINDOW_HALF_LIVES)
@@ -0,0 +1,39 @@
+"""the site wide activity feed (/feed) read from its own table instead of joining comments, users and pokemon for every page.
+
+`activity_feed` has one narrow row per comment (comment id, timestamp, user id, username, pokemon name), written in the same transaction as the comment by the mapper events in models.py. Pages are read newest first with a (timestamp, comment_id) cursor, so every page is one range scan of `ix_activity_feed_timestamp` no matter how deep it is or how many comments there are.
+
+* rows are removed by the foreign key cascade when their comment (or its user) is deleted.
+* a user changing their username rewrites their rows through `ix_activity_feed_user_id`.
+* `rebuild` refills the table from comments after bulk inserts or raw SQL that bypass the events."""
+
+from sqlalchemy import text
+
+ADD_ENTRY = text('''
+    INSERT INTO activity_feed (comment_id, timestamp, user_id, username, pokemon_name)
+    SELECT :comment_id, :timestamp, users.id, users.username, pokemon.pokemon_name
+    FROM users, pokemon
+    WHERE users.id = :user_id AND pokemon.id = :pokemon_id
+''')
+
+RENAME_USER = text('UPDATE activity_feed SET username = :username WHERE user_id = :user_id')
+
+
+def comment_added(connection, comment_id, user_id, pokemon_id, timestamp):
+    connection.execute(ADD_ENTRY, comment_id=comment_id, user_id=user_id, pokemon_id=pokemon_id, timestamp=timestamp)
+
+
+def username_changed(connection, user_id, username):
+    connection.execute(RENAME_USER, user_id=user_id, username=username)
+
+
+def rebuild(connection):
+    """recomputes the whole feed from the comments table."""
+
+    connection.execute(text('DELETE FROM activity_feed'))
+    connection.execute(text('''
+        INSERT INTO activity_feed (comment_id, timestamp, user_id, username, pokemon_name)
+        SELECT comments.id, comments.timestamp, users.id, users.username, pokemon.pokemon_name
+        FROM comments
+        JOIN users ON users.id = comments.user_id
+        JOIN pokemon ON pokemon.id = comments.pokemon_id
+    '''))
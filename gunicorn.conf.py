@@ -0,0 +1,23 @@
+"""gunicorn settings, all of which can be changed per deployment through environment variables.
+
+WEB_WORKER_CLASS=gevent runs every worker as an event loop so requests waiting on PokeAPI (or Postgres) no longer hold the whole worker. The default stays `sync`.
+"""
+
+import os
+
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'sync')
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# max number of requests a single gevent worker handles at once (ignored by sync workers).
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 100))
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # gunicorn already monkey patches the standard library (sockets used by requests), psycopg2 talks to Postgres from C so it needs its own patch to yield while waiting on queries.
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
@@ -0,0 +1,164 @@
+"""bulk ingestion of pokemon details (types, stats, abilities, moves, base exp and sprites) into the database.
+
+The seed file only stores the national dex names, this command fills in everything else that the detail page needs so it can be rendered without calling PokeAPI. Run it after seeding:
+
+    python ingest.py                        # fetch from PokeAPI with 8 workers
+    python ingest.py --dump pokemon.json    # import from a local json dump instead
+    python ingest.py --workers 16 --batch-size 100
+    python ingest.py --force                # re-sync pokemon that were already stored
+
+The dump file is a json list of objects in the same shape as https://pokeapi.co/api/v2/pokemon/<id>/.
+
+The command is resumable: every batch is committed on its own and marks its pokemon with `details_synced_at`, so stopping the command (or a failed request) only means those pokemon are picked up again on the next run.
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app import create_app
+from cache import TTLCache
+from models import db, Pokemon, Type, Stat, Ability, Move, PokemonType, PokemonStat, PokemonAbility, PokemonMove
+from pokeapi import PokeAPIClient
+
+
+def load_dump(path):
+    """reads a local json dump and returns the pokemon data keyed by national id."""
+
+    with open(path) as f:
+        return {item['id']: item for item in json.load(f)}
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class LookupTable:
+    """get-or-create helper for the small name tables (types, stats, abilities, moves) that keeps every known name in memory for the whole run."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {name: id for id, name in db.session.query(model.id, model.name)}
+
+    def get_ids(self, names):
+        new_rows = [self.model(name=name) for name in set(names) if name not in self.ids]
+
+        if new_rows:
+            db.session.add_all(new_rows)
+            db.session.flush()
+            self.ids.update({row.name: row.id for row in new_rows})
+
+        return self.ids
+
+
+def store_batch(batch, lookups, synced_at):
+    """normalizes the api data for a batch of pokemon and writes it with one bulk insert per table."""
+
+    ids = [pokemon_id for pokemon_id, _ in batch]
+
+    # clearing out old rows first means --force re-syncs do not run into duplicate keys.
+    for model in (PokemonType, PokemonStat, PokemonAbility, PokemonMove):
+        model.query.filter(model.pokemon_id.in_(ids)).delete(synchronize_session=False)
+
+    type_ids = lookups['types'].get_ids(t['type']['name'] for _, data in batch for t in data['types'])
+    stat_ids = lookups['stats'].get_ids(s['stat']['name'] for _, data in batch for s in data['stats'])
+    ability_ids = lookups['abilities'].get_ids(a['ability']['name'] for _, data in batch for a in data['abilities'])
+    move_ids = lookups['moves'].get_ids(m['move']['name'] for _, data in batch for m in data['moves'])
+
+    pokemon_rows, type_rows, stat_rows, ability_rows, move_rows = [], [], [], [], []
+
+    for pokemon_id, data in batch:
+        pokemon_rows.append({
+            'id': pokemon_id,
+            'base_experience': data['base_experience'],
+            'front_default': data['sprites']['front_default'],
+            'front_shiny': data['sprites']['front_shiny'],
+            'details_synced_at': synced_at,
+        })
+
+        type_rows.extend({'pokemon_id': pokemon_id, 'type_id': type_ids[t['type']['name']], 'slot': t['slot']}
+                         for t in data['types'])
+
+        stat_rows.extend({'pokemon_id': pokemon_id, 'stat_id': stat_ids[s['stat']['name']], 'base_stat': s['base_stat']}
+                         for s in data['stats'])
+
+        ability_rows.extend({'pokemon_id': pokemon_id, 'ability_id': ability_ids[a['ability']['name']], 'slot': a['slot'], 'is_hidden': a['is_hidden']}
+                            for a in data['abilities'])
+
+        # the api can list the same move more than once for different games.
+        move_rows.extend({'pokemon_id': pokemon_id, 'move_id': move_id}
+                         for move_id in {move_ids[m['move']['name']] for m in data['moves']})
+
+    db.session.bulk_update_mappings(Pokemon, pokemon_rows)
+
+    for model, rows in ((PokemonType, type_rows), (PokemonStat, stat_rows), (PokemonAbility, ability_rows), (PokemonMove, move_rows)):
+        if rows:
+            db.session.execute(model.__table__.insert(), rows)
+
+    db.session.commit()
+
+
+def ingest(dump=None, workers=8, batch_size=50, force=False):
+    """stores details for every pokemon that has not been synced yet (or all of them when force is set)."""
+
+    query = db.session.query(Pokemon.id).order_by(Pokemon.id)
+    if not force:
+        query = query.filter(Pokemon.details_synced_at.is_(None))
+
+    pending = [pokemon_id for pokemon_id, in query]
+
+    print(f'{len(pending)} pokemon to sync')
+
+    if dump is not None:
+        dump_data = load_dump(dump)
+
+        def fetch(pokemon_id):
+            return pokemon_id, dump_data.get(pokemon_id)
+    else:
+        # responses are only needed once, so there is no point keeping them in a cache.
+        client = PokeAPIClient(cache=TTLCache(max_size=0), pool_size=workers)
+
+        def fetch(pokemon_id):
+            try:
+                return pokemon_id, client.fetch(f'pokemon/{pokemon_id}')
+            except Exception as e:
+                print(f'failed to fetch pokemon {pokemon_id}: {e}')
+                return pokemon_id, None
+
+    lookups = {
+        'types': LookupTable(Type),
+        'stats': LookupTable(Stat),
+        'abilities': LookupTable(Ability),
+        'moves': LookupTable(Move),
+    }
+
+    synced = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for ids in chunks(pending, batch_size):
+            start = time.perf_counter()
+
+            batch = [(pokemon_id, data) for pokemon_id, data in executor.map(fetch, ids) if data is not None]
+
+            if batch:
+                store_batch(batch, lookups, datetime.utcnow())
+
+            synced += len(batch)
+            print(f'synced {synced}/{len(pending)} ({len(batch)} in {time.perf_counter() - start:.2f}s)')
+
+    return synced
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Store pokemon details from PokeAPI (or a local dump) in the database.')
+    parser.add_argument('--dump', help='path to a local json dump to import instead of calling PokeAPI')
+    parser.add_argument('--workers', type=int, default=8, help='number of concurrent PokeAPI requests')
+    parser.add_argument('--batch-size', type=int, default=50, help='number of pokemon written per transaction')
+    parser.add_argument('--force', action='store_true', help='re-sync pokemon that already have details stored')
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        ingest(dump=args.dump, workers=args.workers, batch_size=args.batch_size, force=args.force)
@@ -0,0 +1,254 @@
+"""request level performance metrics in the Prometheus text format.
+
+`init_app` times every request and records, per request:
+
+* latency by endpoint / method / status
+* number of SQL queries and the time spent in them
+* time spent calling PokeAPI
+* time spent rendering templates
+
+Everything is kept in memory per worker process and served on `/metrics`. Other stats the application already keeps (cache hit rates, PokeAPI client counters, bcrypt timings) are added with `register_stats`.
+
+Settings (environment variables):
+
+* `METRICS_TOKEN` - when set, /metrics requires `Authorization: Bearer <token>`. The production config (`METRICS_REQUIRE_TOKEN`) answers 404 while no token is set, so the numbers are never public by accident.
+* `SERVER_TIMING` - when true, every response gets a `Server-Timing` header with the same per request timings so they show up in the browser's network panel.
+
+With more than one gunicorn worker each scrape only sees the worker that answered it. `benchmarks/metrics_overhead.py` measures the cost per request.
+"""
+
+import bisect
+import os
+import threading
+import time
+from hmac import compare_digest
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+
+PREFIX = 'pokeforum'
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """fixed bucket histogram with optional labels. Buckets are stored non-cumulative and added up when rendered, so observing a value is one bisect and three additions."""
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = f'{PREFIX}_{name}'
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(label_values)
+
+            if series is None:
+                # [per bucket counts (+Inf last), sum, count]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+
+        with self._lock:
+            series = [(label_values, list(counts), total, count) for label_values, (counts, total, count) in sorted(self._series.items())]
+
+        for label_values, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}')
+
+            lines.append(f'{self.name}_sum{_labels(self.labels, label_values)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labels, label_values)} {count}')
+
+        return lines
+
+
+REQUEST_SECONDS = Histogram('request_duration_seconds', 'Time to handle a request.', ('endpoint', 'method', 'status'))
+SQL_QUERIES = Histogram('request_sql_queries', 'SQL queries run per request.', ('endpoint',), QUERY_COUNT_BUCKETS)
+SQL_SECONDS = Histogram('request_sql_seconds', 'Time spent in SQL queries per request.', ('endpoint',))
+POKEAPI_SECONDS = Histogram('pokeapi_call_seconds', 'Time spent on a single PokeAPI call.')
+TEMPLATE_SECONDS = Histogram('template_render_seconds', 'Time to render a template.', ('template',))
+
+HISTOGRAMS = [REQUEST_SECONDS, SQL_QUERIES, SQL_SECONDS, POKEAPI_SECONDS, TEMPLATE_SECONDS]
+
+# name -> function returning a flat {key: number} dict, rendered as gauges.
+_stats = {}
+
+
+def register_stats(name, fn):
+    """exports the numbers returned by `fn()` as `pokeforum_<name>_<key>` gauges every time /metrics is scraped."""
+
+    _stats[name] = fn
+
+
+class RequestTimings:
+    """per request totals, kept on `g` while the request runs."""
+
+    __slots__ = ('start', 'sql_queries', 'sql_seconds', 'pokeapi_seconds', 'template_seconds', 'template_starts')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.pokeapi_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_starts = []
+
+
+def current_timings():
+    """returns the RequestTimings of the running request, or None outside of a request (scripts, tests, ingest.py)."""
+
+    if not has_request_context():
+        return None
+
+    return g.get('_timings')
+
+
+def observe_pokeapi(seconds):
+    """called by the PokeAPI client after every upstream call."""
+
+    POKEAPI_SECONDS.observe(seconds)
+
+    timings = current_timings()
+    if timings is not None:
+        timings.pokeapi_seconds += seconds
+
+
+_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy():
+    """counts and times every query run by any SQLAlchemy engine. Calling it again (every create_app does) is a no-op."""
+
+    global _sqlalchemy_instrumented
+
+    if _sqlalchemy_instrumented:
+        return
+
+    _sqlalchemy_instrumented = True
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['_metrics_query_start'].pop()
+
+        timings = current_timings()
+        if timings is not None:
+            timings.sql_queries += 1
+            timings.sql_seconds += seconds
+
+
+def _before_render(app, template, context, **extra):
+    timings = current_timings()
+    if timings is not None:
+        timings.template_starts.append(time.perf_counter())
+
+
+def _after_render(app, template, context, **extra):
+    timings = current_timings()
+    if timings is not None and timings.template_starts:
+        seconds = time.perf_counter() - timings.template_starts.pop()
+        timings.template_seconds += seconds
+        TEMPLATE_SECONDS.observe(seconds, template.name or 'string')
+
+
+def _start_request():
+    g._timings = RequestTimings()
+
+
+def _finish_request(response):
+    timings = g.pop('_timings', None)
+
+    if timings is None:
+        return response
+
+    seconds = time.perf_counter() - timings.start
+    endpoint = request.endpoint or 'none'
+
+    REQUEST_SECONDS.observe(seconds, endpoint, request.method, str(response.status_code))
+    SQL_QUERIES.observe(timings.sql_queries, endpoint)
+    SQL_SECONDS.observe(timings.sql_seconds, endpoint)
+
+    if current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = (
+            f'db;dur={timings.sql_seconds * 1000:.1f};desc="{timings.sql_queries} queries", '
+            f'pokeapi;dur={timings.pokeapi_seconds * 1000:.1f}, '
+            f'tpl;dur={timings.template_seconds * 1000:.1f}, '
+            f'app;dur={seconds * 1000:.1f}'
+        )
+
+    return response
+
+
+def render():
+    """returns every metric in the Prometheus text exposition format."""
+
+    lines = []
+
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    for name, fn in sorted(_stats.items()):
+        for key, value in sorted(fn().items()):
+            metric = f'{PREFIX}_{name}_{key}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {float(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    token = current_app.config['METRICS_TOKEN']
+
+    if not token:
+        if current_app.config['METRICS_REQUIRE_TOKEN']:
+            abort(404)
+    elif not compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """registers the request hooks and the /metrics route on app. Call it before any other before_request / after_request hook so their queries are counted and their time is included."""
+
+    app.config.setdefault('SERVER_TIMING', os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    app.config.setdefault('METRICS_REQUIRE_TOKEN', False)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
@@ -0,0 +1,97 @@
+"""pokemon details, sprites and generation
+
+Revision ID: 07dce8882496
+Revises: 38a405aa0149
+Create Date: 2026-10-18 10:09:47.120554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '07dce8882496'
+down_revision = '38a405aa0149'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('pokemon', sa.Column('generation', sa.Integer(), nullable=True))
+    op.add_column('pokemon', sa.Column('base_experience', sa.Integer(), nullable=True))
+    op.add_column('pokemon', sa.Column('front_default', sa.Text(), nullable=True))
+    op.add_column('pokemon', sa.Column('front_shiny', sa.Text(), nullable=True))
+    op.add_column('pokemon', sa.Column('details_synced_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_pokemon_generation'), 'pokemon', ['generation'], unique=False)
+
+    for table in ('types', 'stats', 'abilities', 'moves'):
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+
+    op.create_table('pokemon_types',
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.Column('type_id', sa.Integer(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['type_id'], ['types.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('pokemon_id', 'type_id')
+    )
+    op.create_table('pokemon_stats',
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.Column('stat_id', sa.Integer(), nullable=False),
+    sa.Column('base_stat', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['stat_id'], ['stats.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('pokemon_id', 'stat_id')
+    )
+    op.create_table('pokemon_abilities',
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.Column('ability_id', sa.Integer(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=False),
+    sa.Column('is_hidden', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['ability_id'], ['abilities.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('pokemon_id', 'ability_id')
+    )
+    op.create_table('pokemon_moves',
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.Column('move_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['move_id'], ['moves.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('pokemon_id', 'move_id')
+    )
+
+    # existing rows get their generation and sprite urls from the national dex number, same as seed.py does for new rows.
+    op.execute("""
+        UPDATE pokemon SET generation = CASE
+            WHEN id <= 151 THEN 1
+            WHEN id <= 251 THEN 2
+            WHEN id <= 386 THEN 3
+            WHEN id <= 493 THEN 4
+            WHEN id <= 649 THEN 5
+            WHEN id <= 721 THEN 6
+            WHEN id <= 809 THEN 7
+            WHEN id <= 905 THEN 8
+        END,
+        front_default = 'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/' || id || '.png',
+        front_shiny = 'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/shiny/' || id || '.png'
+    """)
+
+
+def downgrade():
+    op.drop_table('pokemon_moves')
+    op.drop_table('pokemon_abilities')
+    op.drop_table('pokemon_stats')
+    op.drop_table('pokemon_types')
+    for table in ('moves', 'abilities', 'stats', 'types'):
+        op.drop_table(table)
+    op.drop_index(op.f('ix_pokemon_generation'), table_name='pokemon')
+    op.drop_column('pokemon', 'details_synced_at')
+    op.drop_column('pokemon', 'front_shiny')
+    op.drop_column('pokemon', 'front_default')
+    op.drop_column('pokemon', 'base_experience')
+    op.drop_column('pokemon', 'generation')
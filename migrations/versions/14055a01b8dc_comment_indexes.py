@@ -0,0 +1,35 @@
+"""composite indexes on comments for the profile and pokemon detail pages
+
+The indexes are built CONCURRENTLY so the comments table stays writable while they are created on a live database.
+
+Revision ID: 14055a01b8dc
+Revises: 07dce8882496
+Create Date: 2026-10-18 10:21:35.602971
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '14055a01b8dc'
+down_revision = '07dce8882496'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_comments_user_id_timestamp', 'comments',
+                        ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_comments_pokemon_id_timestamp', 'comments',
+                        ['pokemon_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_comments_pokemon_id_timestamp', table_name='comments', postgresql_concurrently=True)
+        op.drop_index('ix_comments_user_id_timestamp', table_name='comments', postgresql_concurrently=True)
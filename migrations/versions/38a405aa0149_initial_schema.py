@@ -0,0 +1,53 @@
+"""initial schema (users, pokemon, comments)
+
+This matches the tables that seed.py used to create with db.create_all(). Databases created that way should be marked as being on this revision with `flask db stamp 38a405aa0149` before running `flask db upgrade`.
+
+Revision ID: 38a405aa0149
+Revises: 
+Create Date: 2026-10-18 10:02:11.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '38a405aa0149'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pokemon',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pokemon_name', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('pokemon_name')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.Text(), nullable=False),
+    sa.Column('username', sa.Text(), nullable=False),
+    sa.Column('image_url', sa.Text(), nullable=True),
+    sa.Column('password', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(length=140), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('comments')
+    op.drop_table('users')
+    op.drop_table('pokemon')
@@ -0,0 +1,58 @@
+"""pokemon comment counters, last comment times and trending scores
+
+Revision ID: 5b2e8f4c1a7d
+Revises: 83da6ce8e14d
+Create Date: 2026-10-18 12:14:40.512983
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8f4c1a7d'
+down_revision = '83da6ce8e14d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('pokemon', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('pokemon', sa.Column('last_comment_at', sa.DateTime(), nullable=True))
+    op.add_column('users', sa.Column('last_comment_at', sa.DateTime(), nullable=True))
+    op.create_table('pokemon_trending',
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('pokemon_id')
+    )
+
+    # filling everything in from the comments that already exist.
+    op.execute("""
+        UPDATE pokemon SET comment_count = counts.total, last_comment_at = counts.latest
+        FROM (SELECT pokemon_id, count(*) AS total, max(timestamp) AS latest FROM comments GROUP BY pokemon_id) AS counts
+        WHERE pokemon.id = counts.pokemon_id
+    """)
+    op.execute("""
+        UPDATE users SET last_comment_at = latest.latest
+        FROM (SELECT user_id, max(timestamp) AS latest FROM comments GROUP BY user_id) AS latest
+        WHERE users.id = latest.user_id
+    """)
+    # same scoring as counters.py: 12 hour half life, the last 10 half lives of comments.
+    op.execute("""
+        INSERT INTO pokemon_trending (pokemon_id, score, updated_at)
+        SELECT pokemon_id,
+               sum(power(0.5, LEAST(GREATEST(CAST(EXTRACT(EPOCH FROM (now() AT TIME ZONE 'utc') - comments.timestamp) AS float), 0) / 43200, 64))),
+               now() AT TIME ZONE 'utc'
+        FROM comments
+        WHERE comments.timestamp >= (now() AT TIME ZONE 'utc') - interval '5 days'
+        GROUP BY pokemon_id
+    """)
+
+
+def downgrade():
+    op.drop_table('pokemon_trending')
+    op.drop_column('users', 'last_comment_at')
+    op.drop_column('pokemon', 'last_comment_at')
+    op.drop_column('pokemon', 'comment_count')
@@ -0,0 +1,39 @@
+"""regional pokedexes stored locally
+
+Revision ID: 83da6ce8e14d
+Revises: 9d7975c099fd
+Create Date: 2026-10-18 11:32:05.118730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '83da6ce8e14d'
+down_revision = '9d7975c099fd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pokedexes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('synced_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('pokedex_entries',
+    sa.Column('pokedex_id', sa.Integer(), nullable=False),
+    sa.Column('entry_number', sa.Integer(), nullable=False),
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pokedex_id'], ['pokedexes.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('pokedex_id', 'entry_number')
+    )
+
+
+def downgrade():
+    op.drop_table('pokedex_entries')
+    op.drop_table('pokedexes')
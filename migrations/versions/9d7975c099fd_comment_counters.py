@@ -0,0 +1,47 @@
+"""per-user comment counters for the profile page
+
+Revision ID: 9d7975c099fd
+Revises: 14055a01b8dc
+Create Date: 2026-10-18 10:48:12.304118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d7975c099fd'
+down_revision = '14055a01b8dc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('user_pokemon_comment_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('pokemon_id', sa.Integer(), nullable=False),
+    sa.Column('comment_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pokemon_id'], ['pokemon.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('user_id', 'pokemon_id')
+    )
+    op.create_index('ix_user_pokemon_comment_counts_user_id_count', 'user_pokemon_comment_counts',
+                    ['user_id', sa.text('comment_count DESC')], unique=False)
+
+    # counting the comments that already exist.
+    op.execute("""
+        UPDATE users SET comment_count = counts.total
+        FROM (SELECT user_id, count(*) AS total FROM comments GROUP BY user_id) AS counts
+        WHERE users.id = counts.user_id
+    """)
+    op.execute("""
+        INSERT INTO user_pokemon_comment_counts (user_id, pokemon_id, comment_count)
+        SELECT user_id, pokemon_id, count(*) FROM comments GROUP BY user_id, pokemon_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_user_pokemon_comment_counts_user_id_count', table_name='user_pokemon_comment_counts')
+    op.drop_table('user_pokemon_comment_counts')
+    op.drop_column('users', 'comment_count')
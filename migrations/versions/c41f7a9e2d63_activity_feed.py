@@ -0,0 +1,47 @@
+"""activity feed read model
+
+Revision ID: c41f7a9e2d63
+Revises: 5b2e8f4c1a7d
+Create Date: 2026-10-18 12:51:27.840316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7a9e2d63'
+down_revision = '5b2e8f4c1a7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('activity_feed',
+    sa.Column('comment_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.Text(), nullable=False),
+    sa.Column('pokemon_name', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['comment_id'], ['comments.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('comment_id')
+    )
+
+    # filling the table before the indexes exist is a lot faster on a big comments table.
+    op.execute("""
+        INSERT INTO activity_feed (comment_id, timestamp, user_id, username, pokemon_name)
+        SELECT comments.id, comments.timestamp, users.id, users.username, pokemon.pokemon_name
+        FROM comments
+        JOIN users ON users.id = comments.user_id
+        JOIN pokemon ON pokemon.id = comments.pokemon_id
+    """)
+
+    op.create_index('ix_activity_feed_timestamp', 'activity_feed',
+                    [sa.text('timestamp DESC'), sa.text('comment_id DESC')], unique=False)
+    op.create_index('ix_activity_feed_user_id', 'activity_feed', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_activity_feed_user_id', table_name='activity_feed')
+    op.drop_index('ix_activity_feed_timestamp', table_name='activity_feed')
+    op.drop_table('activity_feed')
@@ -1,12 +1,25 @@
+from collections import defaultdict, namedtuple
 from datetime import datetime
 
-from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
-import requests
+from sqlalchemy import cast, event, extract, func, inspect, literal, literal_column, or_, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload, make_transient_to_detached, selectinload
+
+import counters
+import feed
+import passwords
+import pokeapi
+from search import SearchEntry
 
-bcrypt = Bcrypt()
 db = SQLAlchemy()
 
+# PokeAPI serves every default sprite from the same place keyed by national dex number, so the urls can be filled in at seed time without an extra request per pokemon.
+SPRITE_URLS = {
+    'front_default': 'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{}.png',
+    'front_shiny': 'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/shiny/{}.png',
+}
+
 
 def connect_db(app):
     """Connect this database to provided Flask app.
@@ -16,6 +29,30 @@ def connect_db(app):
     db.app = app
     db.init_app(app)
 
+Generation = namedtuple('Generation', ['number', 'region', 'title', 'first_id', 'last_id'])
+
+# national dex ranges for every generation shown on the generations page.
+GENERATIONS = [
+    Generation(1, 'kanto', 'Gen I - Kanto', 1, 151),
+    Generation(2, 'johto', 'Gen II - Johto', 152, 251),
+    Generation(3, 'hoenn', 'Gen III - Hoenn', 252, 386),
+    Generation(4, 'sinnoh', 'Gen IV - Sinnoh', 387, 493),
+    Generation(5, 'unova', 'Gen V - Unova', 494, 649),
+    Generation(6, 'kalos', 'Gen VI - Kalos', 650, 721),
+    Generation(7, 'alola', 'Gen VII - Alola', 722, 809),
+    Generation(8, 'galar', 'Gen VIII - Galar', 810, 905),
+]
+
+
+def generation_for(national_id):
+    """returns the generation number for a national dex id or None when it is outside every known generation."""
+
+    for generation in GENERATIONS:
+        if generation.first_id <= national_id <= generation.last_id:
+            return generation.number
+
+    return None
+
 
 class Pokemon(db.Model):
     """class for each individual pokemon which will also contain the relationships for the comments that each user has made."""
@@ -33,23 +70,447 @@ class Pokemon(db.Model):
         unique=True,
     )
 
+    generation = db.Column(
+        db.Integer,
+        index=True,
+    )
+
+    base_experience = db.Column(
+        db.Integer,
+    )
+
+    front_default = db.Column(
+        db.Text,
+    )
+
+    front_shiny = db.Column(
+        db.Text,
+    )
+
+    # set by the ingestion command once types, stats, abilities and moves have been stored for this pokemon. Rows where this is still empty are picked up again the next time the command runs.
+    details_synced_at = db.Column(
+        db.DateTime,
+    )
+
+    # kept up to date by counters.py whenever a comment is added or removed.
+    comment_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+    )
+
+    last_comment_at = db.Column(
+        db.DateTime,
+    )
+
     comments = db.relationship('Comment', cascade="all,delete")
 
+    types = db.relationship('PokemonType', order_by='PokemonType.slot', cascade="all,delete")
+
+    stats = db.relationship('PokemonStat', order_by='PokemonStat.stat_id', cascade="all,delete")
+
+    abilities = db.relationship('PokemonAbility', order_by='PokemonAbility.slot', cascade="all,delete")
+
+    moves = db.relationship('PokemonMove', order_by='PokemonMove.move_id', cascade="all,delete")
+
     @classmethod
     def get_national_dex(cls):
-        """function is making a call to the external API which will retrieve all the pokemon information and store the information on the backend db. This function does NOT run in the main application file but instead will be run on the seed file to populate the db."""
-        res = requests.get('https://pokeapi.co/api/v2/pokedex/national')
+        """function is making a call to the external API which will retrieve all the pokemon information and store the information on the backend db. This function does NOT run in the main application file but instead will be run on the seed file to populate the db.
 
-        pokemon_object = res.json()['pokemon_entries']
+        Entries are upserted, so calling it again on a seeded database only fills in what is missing and keeps existing ids and comments. The list comes through the shared PokeAPI client, so it gets the same timeouts, retries and circuit breaker as every other call."""
 
-        for item in pokemon_object:
-            # pokemon_name =
-            new_pokemon = Pokemon(
-                pokemon_name=item['pokemon_species']['name']
-            )
-            db.session.add(new_pokemon)
+        pokemon_object = pokeapi.client.get_pokedex('national')['pokemon_entries']
+
+        cls.upsert_national_dex([(item['entry_number'], item['pokemon_species']['name']) for item in pokemon_object])
         return 'completed'
 
+    @classmethod
+    def upsert_national_dex(cls, entries):
+        """inserts or updates (national id, name) pairs with a single INSERT ... ON CONFLICT (pokemon_name) and returns (inserted, updated) counts.
+
+        New pokemon get their national dex number as id. Existing rows keep their id, only their generation is corrected and missing sprite urls are filled in, and rows that are already up to date are not written at all. The caller commits."""
+
+        rows = [{
+            'id': entry_number,
+            'pokemon_name': name,
+            'generation': generation_for(entry_number),
+            'front_default': SPRITE_URLS['front_default'].format(entry_number),
+            'front_shiny': SPRITE_URLS['front_shiny'].format(entry_number),
+        } for entry_number, name in entries]
+
+        if not rows:
+            return 0, 0
+
+        table = cls.__table__
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.pokemon_name],
+            set_={
+                'generation': stmt.excluded.generation,
+                # urls stored by ingest.py win over the default pattern.
+                'front_default': func.coalesce(table.c.front_default, stmt.excluded.front_default),
+                'front_shiny': func.coalesce(table.c.front_shiny, stmt.excluded.front_shiny),
+            },
+            where=or_(table.c.generation.is_distinct_from(stmt.excluded.generation),
+                      table.c.front_default.is_(None),
+                      table.c.front_shiny.is_(None)),
+        # xmax is 0 only for rows this statement inserted, updated rows carry the updating transaction's id.
+        ).returning(literal_column('(xmax = 0)'))
+
+        inserted = [row[0] for row in db.session.execute(stmt)]
+
+        # ids were given explicitly, so the serial sequence has to be moved past them.
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('pokemon', 'id'), (SELECT max(id) FROM pokemon))"))
+
+        return inserted.count(True), inserted.count(False)
+
+    @classmethod
+    def by_generation(cls):
+        """returns a list of (generation, pokemon list) pairs for the generations page using a single ordered query."""
+
+        groups = {generation.number: [] for generation in GENERATIONS}
+
+        for pokemon in cls.query.order_by(cls.id):
+            number = pokemon.generation or generation_for(pokemon.id)
+            if number in groups:
+                groups[number].append(pokemon)
+
+        return [(generation, groups[generation.number]) for generation in GENERATIONS]
+
+    @classmethod
+    def search_entries(cls):
+        """returns a SearchEntry (id, name, generation, type names) for every pokemon, used to build the in-memory search index."""
+
+        types = defaultdict(list)
+
+        for pokemon_id, type_name in (db.session.query(PokemonType.pokemon_id, Type.name)
+                                      .join(Type, Type.id == PokemonType.type_id)
+                                      .order_by(PokemonType.pokemon_id, PokemonType.slot)):
+            types[pokemon_id].append(type_name)
+
+        return [SearchEntry(pokemon_id, name, generation or generation_for(pokemon_id), tuple(types[pokemon_id]))
+                for pokemon_id, name, generation in db.session.query(cls.id, cls.pokemon_name, cls.generation)]
+
+    @classmethod
+    def trending(cls, limit=20, now=None):
+        """returns (pokemon, score) for the pokemon with the highest time decayed comment score, highest first. Scores come from pokemon_trending and are decayed to `now` here, so no comments are read."""
+
+        score = PokemonTrending.decayed_score(now).label('score')
+
+        return (db.session.query(cls, score)
+                .join(PokemonTrending, PokemonTrending.pokemon_id == cls.id)
+                .filter(score > counters.TRENDING_MIN_SCORE)
+                .order_by(score.desc(), cls.id)
+                .limit(limit)
+                .all())
+
+    @classmethod
+    def all_names(cls):
+        """returns every pokemon name."""
+
+        return [name for name, in db.session.query(cls.pokemon_name)]
+
+    @classmethod
+    def by_recent_activity(cls, limit):
+        """returns up to `limit` pokemon names, the highest trending scores (recent comment activity) first and the rest in national dex order. Used by the cache warmer to decide what to fetch first."""
+
+        query = (db.session.query(cls.pokemon_name)
+                 .outerjoin(PokemonTrending, PokemonTrending.pokemon_id == cls.id)
+                 .order_by(func.coalesce(PokemonTrending.decayed_score(), 0).desc(), cls.id)
+                 .limit(limit))
+
+        return [name for name, in query]
+
+    def comments_page(self, before=None, per_page=20):
+        """returns one page of this pokemon's comments (newest first) and the cursor for the next page, or None when there are no older comments.
+
+        Pages are keyed on (timestamp, id) of the last comment shown instead of an offset, so every page is a single index range scan no matter how deep it is, and each comment's user is loaded in the same query."""
+
+        query = (Comment.query
+                 .options(joinedload(Comment.user, innerjoin=True))
+                 .filter(Comment.pokemon_id == self.id))
+
+        if before is not None:
+            query = query.filter(tuple_(Comment.timestamp, Comment.id) < tuple_(*before))
+
+        comments = (query.order_by(Comment.timestamp.desc(), Comment.id.desc())
+                    .limit(per_page + 1).all())
+
+        if len(comments) > per_page:
+            return comments[:per_page], comments[per_page - 1].cursor()
+
+        return comments, None
+
+    def sprite_url(self, variant='front_default'):
+        """returns the stored sprite url for this pokemon, falling back to the PokeAPI url pattern for rows that were seeded before sprites were stored."""
+
+        return getattr(self, variant) or SPRITE_URLS[variant].format(self.id)
+
+    @classmethod
+    def query_with_details(cls):
+        """returns a query that loads a pokemon together with its stored types, stats, abilities and moves using one extra query per relationship instead of one per row."""
+
+        return cls.query.options(
+            selectinload(cls.types).joinedload(PokemonType.type),
+            selectinload(cls.stats).joinedload(PokemonStat.stat),
+            selectinload(cls.abilities).joinedload(PokemonAbility.ability),
+            selectinload(cls.moves).joinedload(PokemonMove.move),
+        )
+
+
+########################################################################################
+# POKEMON DETAIL TABLES (populated by ingest.py)
+########################################################################################
+
+class Type(db.Model):
+    """pokemon type such as fire or water."""
+
+    __tablename__ = 'types'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+
+class Stat(db.Model):
+    """base stat such as hp or speed."""
+
+    __tablename__ = 'stats'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+
+class Ability(db.Model):
+    """pokemon ability."""
+
+    __tablename__ = 'abilities'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+
+class Move(db.Model):
+    """move that a pokemon can learn."""
+
+    __tablename__ = 'moves'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+
+class PokemonType(db.Model):
+    """join table between pokemon and types."""
+
+    __tablename__ = 'pokemon_types'
+
+    pokemon_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokemon.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    type_id = db.Column(
+        db.Integer,
+        db.ForeignKey('types.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    slot = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+
+    type = db.relationship('Type')
+
+
+class PokemonStat(db.Model):
+    """base stat value for a pokemon."""
+
+    __tablename__ = 'pokemon_stats'
+
+    pokemon_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokemon.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    stat_id = db.Column(
+        db.Integer,
+        db.ForeignKey('stats.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    base_stat = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+
+    stat = db.relationship('Stat')
+
+
+class PokemonAbility(db.Model):
+    """join table between pokemon and abilities."""
+
+    __tablename__ = 'pokemon_abilities'
+
+    pokemon_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokemon.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    ability_id = db.Column(
+        db.Integer,
+        db.ForeignKey('abilities.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    slot = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+
+    is_hidden = db.Column(
+        db.Boolean,
+        nullable=False,
+        default=False,
+    )
+
+    ability = db.relationship('Ability')
+
+
+class PokemonMove(db.Model):
+    """join table between pokemon and the moves they can learn."""
+
+    __tablename__ = 'pokemon_moves'
+
+    pokemon_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokemon.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    move_id = db.Column(
+        db.Integer,
+        db.ForeignKey('moves.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    move = db.relationship('Move')
+
+
+########################################################################################
+# REGIONAL POKEDEXES (populated by seed.py)
+########################################################################################
+
+class Pokedex(db.Model):
+    """regional pokedex such as hoenn or kalos-central. Membership only changes when new games come out, so the entries are stored locally instead of being fetched for every page view."""
+
+    __tablename__ = 'pokedexes'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False,
+        unique=True,
+    )
+
+    synced_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def entries(self):
+        """returns (entry_number, pokemon_name) rows for this pokedex in dex order, read straight off the primary key index."""
+
+        return (db.session.query(PokedexEntry.entry_number, Pokemon.pokemon_name)
+                .join(Pokemon, Pokemon.id == PokedexEntry.pokemon_id)
+                .filter(PokedexEntry.pokedex_id == self.id)
+                .order_by(PokedexEntry.entry_number)
+                .all())
+
+    @classmethod
+    def store(cls, data):
+        """saves a PokeAPI /pokedex/<name> response, replacing any entries stored before, and returns (stored, skipped) entry counts. Entries for species that are not in the pokemon table yet are skipped. The caller commits."""
+
+        stmt = insert(cls.__table__).values(id=data['id'], name=data['name'], synced_at=datetime.utcnow())
+        db.session.execute(stmt.on_conflict_do_update(index_elements=[cls.__table__.c.name],
+                                                      set_={'synced_at': stmt.excluded.synced_at}))
+
+        pokedex_id = db.session.query(cls.id).filter(cls.name == data['name']).scalar()
+        pokemon_ids = dict(db.session.query(Pokemon.pokemon_name, Pokemon.id))
+
+        rows = [{'pokedex_id': pokedex_id, 'entry_number': entry['entry_number'], 'pokemon_id': pokemon_ids[entry['pokemon_species']['name']]}
+                for entry in data['pokemon_entries'] if entry['pokemon_species']['name'] in pokemon_ids]
+
+        PokedexEntry.query.filter(PokedexEntry.pokedex_id == pokedex_id).delete(synchronize_session=False)
+
+        if rows:
+            db.session.execute(PokedexEntry.__table__.insert(), rows)
+
+        return len(rows), len(data['pokemon_entries']) - len(rows)
+
+
+class PokedexEntry(db.Model):
+    """a pokemon's number in a regional pokedex."""
+
+    __tablename__ = 'pokedex_entries'
+
+    pokedex_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokedexes.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    entry_number = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    pokemon_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokemon.id', ondelete='cascade'),
+        nullable=False,
+    )
+
 
 class User(db.Model):
     """user class"""
@@ -86,13 +547,66 @@ class User(db.Model):
         nullable=False,
     )
 
-    comments = db.relationship('Comment', cascade="all,delete")
+    # kept up to date by counters.py whenever a comment is added or removed so the profile page never has to count a user's comments.
+    comment_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+    )
+
+    last_comment_at = db.Column(
+        db.DateTime,
+    )
+
+    # passive_deletes leaves removing a deleted user's comments to the ondelete='cascade' foreign key, instead of loading every comment into the session and deleting them one at a time.
+    comments = db.relationship('Comment', cascade="all,delete", passive_deletes=True)
+
+    def comments_page(self, before=None, per_page=20):
+        """returns one page of this user's comments (newest first) with each comment's pokemon loaded in the same query, and the cursor for the next page or None when there are no older comments."""
+
+        query = (Comment.query
+                 .options(joinedload(Comment.pokemon, innerjoin=True))
+                 .filter(Comment.user_id == self.id))
+
+        if before is not None:
+            query = query.filter(tuple_(Comment.timestamp, Comment.id) < tuple_(*before))
+
+        comments = (query.order_by(Comment.timestamp.desc(), Comment.id.desc())
+                    .limit(per_page + 1).all())
+
+        if len(comments) > per_page:
+            return comments[:per_page], comments[per_page - 1].cursor()
+
+        return comments, None
+
+    def top_pokemon(self, limit=3):
+        """returns (pokemon_name, comment_count) for the pokemon this user has commented on the most."""
+
+        return (db.session.query(Pokemon.pokemon_name, UserPokemonCommentCount.comment_count)
+                .join(UserPokemonCommentCount, UserPokemonCommentCount.pokemon_id == Pokemon.id)
+                .filter(UserPokemonCommentCount.user_id == self.id, UserPokemonCommentCount.comment_count > 0)
+                .order_by(UserPokemonCommentCount.comment_count.desc(), Pokemon.id)
+                .limit(limit).all())
+
+    def snapshot(self):
+        """returns this user's column values as a plain dict that can be cached between requests."""
+
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+
+    @classmethod
+    def from_snapshot(cls, values):
+        """rebuilds a user from `snapshot()` values and attaches it to the current session without querying the database."""
+
+        user = cls(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
 
     @classmethod
     def signup(cls, username, email, password, image_url):
         """function is responsible for taking information from the user signup form and creating a new user profile with a hashed password."""
 
-        hashed_pwd = bcrypt.generate_password_hash(password).decode('UTF-8')
+        hashed_pwd = passwords.hash_password(password)
 
         user = User(
             username=username,
@@ -111,8 +625,13 @@ class User(db.Model):
         user = cls.query.filter_by(username=username).first()
 
         if user:
-            is_auth = bcrypt.check_password_hash(user.password, password)
+            is_auth = passwords.check_password(user.password, password)
             if is_auth:
+                # hashes made with an older work factor get upgraded while we still have the plain password.
+                if passwords.needs_rehash(user.password):
+                    user.password = passwords.hash_password(password)
+                    db.session.commit()
+
                 return user
 
         return False
@@ -136,7 +655,7 @@ class Comment(db.Model):
     timestamp = db.Column(
         db.DateTime,
         nullable=False,
-        default=datetime.utcnow(),
+        default=datetime.utcnow,
     )
 
     user_id = db.Column(
@@ -154,3 +673,162 @@ class Comment(db.Model):
     user = db.relationship('User')
 
     pokemon = db.relationship('Pokemon')
+
+    CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
+
+    def cursor(self):
+        """returns the pagination cursor pointing just past this comment."""
+
+        return f'{self.timestamp.strftime(self.CURSOR_FORMAT)}-{self.id}'
+
+    @classmethod
+    def parse_cursor(cls, cursor):
+        """turns a cursor string back into a (timestamp, id) tuple, returns None for missing or malformed cursors."""
+
+        try:
+            timestamp, comment_id = cursor.split('-')
+            return datetime.strptime(timestamp, cls.CURSOR_FORMAT), int(comment_id)
+        except (AttributeError, ValueError):
+            return None
+
+
+@event.listens_for(Comment, 'after_insert')
+def count_new_comment(mapper, connection, comment):
+    counters.comment_added(connection, comment.user_id, comment.pokemon_id, comment.timestamp)
+
+
+@event.listens_for(Comment, 'after_delete')
+def count_deleted_comment(mapper, connection, comment):
+    counters.comment_removed(connection, comment.user_id, comment.pokemon_id, comment.timestamp)
+
+
+@event.listens_for(User, 'before_delete')
+def uncount_deleted_user(mapper, connection, user):
+    counters.user_removed(connection, user.id)
+
+
+@event.listens_for(Comment, 'after_insert')
+def add_comment_to_feed(mapper, connection, comment):
+    feed.comment_added(connection, comment.id, comment.user_id, comment.pokemon_id, comment.timestamp)
+
+
+@event.listens_for(User, 'after_update')
+def rename_in_feed(mapper, connection, user):
+    if inspect(user).attrs.username.history.has_changes():
+        feed.username_changed(connection, user.id, user.username)
+
+
+class UserPokemonCommentCount(db.Model):
+    """how many comments a user has left on one pokemon, maintained by counters.py. Rows only exist for pairs with at least one comment."""
+
+    __tablename__ = 'user_pokemon_comment_counts'
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    pokemon_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokemon.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    comment_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+    )
+
+
+class PokemonTrending(db.Model):
+    """time decayed comment score per pokemon for /trending, maintained by counters.py. `score` is the value as of `updated_at`."""
+
+    __tablename__ = 'pokemon_trending'
+
+    pokemon_id = db.Column(
+        db.Integer,
+        db.ForeignKey('pokemon.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    score = db.Column(
+        db.Float,
+        nullable=False,
+        default=0,
+    )
+
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+    )
+
+    @classmethod
+    def decayed_score(cls, now=None):
+        """SQL expression for the score decayed to `now` (the same formula as counters.decay)."""
+
+        seconds = func.greatest(cast(extract('epoch', literal(now or datetime.utcnow(), db.DateTime) - cls.updated_at), db.Float), 0)
+        return cls.score * func.power(0.5, func.least(seconds / counters.TRENDING_HALF_LIFE, 64))
+
+
+class ActivityFeedEntry(db.Model):
+    """one row per comment for the site wide activity feed, maintained by feed.py."""
+
+    __tablename__ = 'activity_feed'
+
+    comment_id = db.Column(
+        db.Integer,
+        db.ForeignKey('comments.id', ondelete='cascade'),
+        primary_key=True,
+    )
+
+    timestamp = db.Column(
+        db.DateTime,
+        nullable=False,
+    )
+
+    user_id = db.Column(
+        db.Integer,
+        nullable=False,
+    )
+
+    username = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    pokemon_name = db.Column(
+        db.Text,
+        nullable=False,
+    )
+
+    def cursor(self):
+        """returns the pagination cursor pointing just past this entry, in the same format as Comment.cursor."""
+
+        return f'{self.timestamp.strftime(Comment.CURSOR_FORMAT)}-{self.comment_id}'
+
+    @classmethod
+    def page(cls, before=None, per_page=30):
+        """returns one page of the feed (newest first) and the cursor for the next page, or None when there is nothing older. `before` is a (timestamp, comment_id) tuple from Comment.parse_cursor."""
+
+        query = cls.query
+
+        if before is not None:
+            query = query.filter(tuple_(cls.timestamp, cls.comment_id) < tuple_(*before))
+
+        entries = query.order_by(cls.timestamp.desc(), cls.comment_id.desc()).limit(per_page + 1).all()
+
+        if len(entries) > per_page:
+            return entries[:per_page], entries[per_page - 1].cursor()
+
+        return entries, None
+
+
+# the profile page lists a user's newest comments and the detail page lists a pokemon's newest comments. id is included so keyset pagination on (timestamp, id) is served by the index alone.
+db.Index('ix_comments_user_id_timestamp', Comment.user_id, Comment.timestamp.desc(), Comment.id.desc())
+db.Index('ix_comments_pokemon_id_timestamp', Comment.pokemon_id, Comment.timestamp.desc(), Comment.id.desc())
+db.Index('ix_user_pokemon_comment_counts_user_id_count', UserPokemonCommentCount.user_id, UserPokemonCommentCount.comment_count.desc())
+# each feed page is one range scan of this index, the user_id index is only used when someone changes their username.
+db.Index('ix_activity_feed_timestamp', ActivityFeedEntry.timestamp.desc(), ActivityFeedEntry.comment_id.desc())
+db.Index('ix_activity_feed_user_id', ActivityFeedEntry.user_id)
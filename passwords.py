@@ -0,0 +1,96 @@
+"""password hashing for user accounts.
+
+Bcrypt is deliberately slow, so hashing and checking run in a small pool of worker processes instead of on the web worker itself. The pool size caps how many CPU cores a login spike can take up while every other request keeps being served.
+
+Settings (environment variables):
+
+* `BCRYPT_LOG_ROUNDS` - bcrypt work factor for new hashes (default 12). Users whose stored hash uses a different work factor are rehashed the next time they log in.
+* `BCRYPT_POOL_SIZE` - number of hashing processes (default 2). 0 hashes inline on the calling thread.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+BCRYPT_POOL_SIZE = int(os.environ.get('BCRYPT_POOL_SIZE', 2))
+
+# count / total seconds / slowest call for each operation, used to tune the work factor against throughput.
+stats = {
+    'hash': {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0},
+    'check': {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0},
+}
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(hashed, password):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def _get_pool():
+    """creates the process pool the first time it is needed. This happens after gunicorn forks so every worker gets its own pool."""
+
+    global _pool
+
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=BCRYPT_POOL_SIZE)
+
+        return _pool
+
+
+def _run(operation, fn, *args):
+    start = time.perf_counter()
+
+    if BCRYPT_POOL_SIZE > 0:
+        try:
+            result = _get_pool().submit(fn, *args).result()
+        except BrokenProcessPool:
+            # a killed hashing process breaks the whole pool, the next call starts a fresh one.
+            global _pool
+            with _lock:
+                _pool = None
+            result = fn(*args)
+    else:
+        result = fn(*args)
+
+    elapsed = time.perf_counter() - start
+
+    with _lock:
+        stat = stats[operation]
+        stat['count'] += 1
+        stat['seconds'] += elapsed
+        stat['max_seconds'] = max(stat['max_seconds'], elapsed)
+
+    return result
+
+
+def hash_password(password, rounds=None):
+    """returns a bcrypt hash of password as a string."""
+
+    return _run('hash', _hash, password, rounds or BCRYPT_LOG_ROUNDS)
+
+
+def check_password(hashed, password):
+    """returns True when password matches the stored hash."""
+
+    return _run('check', _check, hashed, password)
+
+
+def needs_rehash(hashed):
+    """returns True when the stored hash was made with a different work factor than the current setting."""
+
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_LOG_ROUNDS
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,345 @@
+"""client for the PokeAPI endpoints that the application reads from.
+
+Every response goes through a `TTLCache` first so repeat visits to the same pokemon or pokedex do not pay for another round trip to pokeapi.co.
+
+Calls that do go upstream use a keep-alive connection pool, a timeout and a couple of retries with backoff. When PokeAPI keeps failing, a circuit breaker stops sending it requests for a while and the client serves the last cached (stale) copy instead, or raises `UpstreamUnavailable` so the route can show a degraded page.
+
+With a `BackgroundRefresher` the client also does stale-while-revalidate: an entry close to expiry (or expired less than `max_stale` seconds ago) is returned straight away and re-fetched on a small background pool, so a request never waits on PokeAPI for something that was already cached."""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from urllib3.util.retry import Retry
+
+import metrics
+from cache import TTLCache
+from records import PokemonRecord
+
+POKEAPI_URL = os.environ.get('POKEAPI_URL', 'https://pokeapi.co/api/v2')
+
+# keep-alive connections kept open to PokeAPI per worker. With gevent workers this should be close to WEB_WORKER_CONNECTIONS so concurrent requests do not queue for a connection.
+POKEAPI_POOL_SIZE = int(os.environ.get('POKEAPI_POOL_SIZE', 20))
+
+# seconds to wait for a connection / for the response.
+POKEAPI_TIMEOUT = (3.05, float(os.environ.get('POKEAPI_TIMEOUT', 5)))
+
+POKEAPI_RETRIES = int(os.environ.get('POKEAPI_RETRIES', 2))
+
+# background threads re-fetching entries that are about to expire (0 turns stale-while-revalidate off).
+POKEAPI_REFRESH_WORKERS = int(os.environ.get('POKEAPI_REFRESH_WORKERS', 2))
+
+# entries with less than this many seconds left are refreshed in the background when they are read.
+POKEAPI_REFRESH_AHEAD = int(os.environ.get('POKEAPI_REFRESH_AHEAD', 60 * 60))
+
+# how long past its expiry an entry may still be served while a fresh copy is fetched.
+POKEAPI_MAX_STALE = int(os.environ.get('POKEAPI_MAX_STALE', 60 * 60 * 24))
+
+# seconds a 404 from PokeAPI is remembered so the same bad path is not requested again.
+POKEAPI_NEGATIVE_TTL = int(os.environ.get('POKEAPI_NEGATIVE_TTL', 60 * 60))
+
+
+class UpstreamUnavailable(Exception):
+    """raised when PokeAPI cannot be reached and there is no cached copy to fall back to."""
+
+
+class NotFound(requests.HTTPError):
+    """raised when PokeAPI answered (or recently answered) 404 for a path."""
+
+
+class CircuitBreaker:
+    """stops calls to a failing upstream for `reset_timeout` seconds after `failure_threshold` failures in a row.
+
+    Once the timeout passes a single trial call is let through (half open). If it works the breaker closes again, if not it stays open for another timeout."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+
+        return 'open'
+
+    def allow(self):
+        """returns True when a call to the upstream should be attempted."""
+
+        with self._lock:
+            if self.state == 'open':
+                return False
+
+            if self.state == 'half-open':
+                # letting one trial call through and holding the rest back until it finishes.
+                self.opened_at = self.clock()
+
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+class LatencyTracker:
+    """keeps the most recent upstream call durations to report latency percentiles."""
+
+    def __init__(self, size=1000):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentiles(self, points=(50, 90, 99)):
+        """returns {'p50': seconds, ...} for the recorded samples (empty when nothing was recorded yet)."""
+
+        samples = sorted(self.samples)
+
+        if not samples:
+            return {}
+
+        return {f'p{point}': samples[min(len(samples) - 1, len(samples) * point // 100)] for point in points}
+
+
+class BackgroundRefresher:
+    """runs refresh jobs on a small thread pool.
+
+    Jobs are keyed so the same path is never refreshed twice at once, and at most `max_pending` jobs wait for a thread; anything past that is dropped (the entry is simply refreshed on a later read). That keeps a burst of expiring entries from queueing up unbounded work or hammering the upstream."""
+
+    def __init__(self, max_workers=2, max_pending=100):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pokeapi-refresh')
+        self._pending = set()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'scheduled': 0,
+            'dropped': 0,
+            'failed': 0,
+        }
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, key, fn):
+        """schedules fn() unless a job for key is already pending or the queue is full. Returns True when it was scheduled."""
+
+        with self._lock:
+            if key in self._pending:
+                return False
+
+            if len(self._pending) >= self.max_pending:
+                self.stats['dropped'] += 1
+                return False
+
+            self._pending.add(key)
+            self.stats['scheduled'] += 1
+
+        self._executor.submit(self._run, key, fn)
+        return True
+
+    def _run(self, key, fn):
+        try:
+            fn()
+        except Exception:
+            # the cached copy stays in place and the next read schedules another try.
+            with self._lock:
+                self.stats['failed'] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def wait(self):
+        """blocks until every pending job has finished (used by tests and scripts)."""
+
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+            time.sleep(0.01)
+
+
+class PokeAPIClient:
+    """read-through cache wrapper around the PokeAPI json endpoints."""
+
+    def __init__(self, base_url=POKEAPI_URL, cache=None, pool_size=POKEAPI_POOL_SIZE,
+                 timeout=POKEAPI_TIMEOUT, retries=POKEAPI_RETRIES, breaker=None,
+                 refresher=None, refresh_ahead=POKEAPI_REFRESH_AHEAD, max_stale=POKEAPI_MAX_STALE,
+                 negative_ttl=POKEAPI_NEGATIVE_TTL):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache if cache is not None else TTLCache()
+        self.timeout = timeout
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.latency = LatencyTracker()
+
+        self.refresher = refresher
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+
+        # paths PokeAPI answered 404 for. Kept apart from the main cache so a miss never shows up as a stale copy.
+        self.missing = TTLCache(max_size=4096, ttl=negative_ttl, clock=self.cache.clock)
+
+        self.stats = {
+            'requests': 0,
+            'failures': 0,
+            'stale_served': 0,
+            'short_circuited': 0,
+            'revalidations': 0,
+            'not_found': 0,
+            'negative_hits': 0,
+        }
+
+        # one session per client so connections to PokeAPI are reused instead of opening a new one (and a new TLS handshake) for every call.
+        retry = Retry(total=retries, backoff_factor=0.2, status_forcelist=(429, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']), raise_on_status=False)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, path, transform=None):
+        """returns the parsed json for `path`, only calling the API when the path is not cached.
+
+        When `transform` is given it is applied to the json before caching, so only its (smaller) result is kept."""
+
+        data = self.cache.get(path)
+
+        if data is not None:
+            if self.refresher is not None:
+                # None when another thread evicted the entry since the get above, there is nothing left to refresh ahead of then.
+                expires_in = self.cache.expires_in(path)
+                if expires_in is not None and expires_in < self.refresh_ahead:
+                    self._revalidate(path, transform)
+            return data
+
+        if self.missing.get(path) is not None:
+            self.stats['negative_hits'] += 1
+            raise NotFound(path)
+
+        if self.refresher is not None:
+            expires_in = self.cache.expires_in(path)
+
+            # expired, but recently enough to serve while a fresh copy is fetched in the background.
+            if expires_in is not None and -expires_in <= self.max_stale:
+                data = self.cache.get_stale(path)
+                if data is not None:
+                    self.stats['stale_served'] += 1
+                    self._revalidate(path, transform)
+                    return data
+
+        if not self.breaker.allow():
+            self.stats['short_circuited'] += 1
+            return self._fallback(path)
+
+        data = self._request(path, transform)
+
+        if data is None:
+            return self._fallback(path)
+
+        return data
+
+    def refresh(self, path, transform=None):
+        """fetches a fresh copy of path into the cache whether or not one is cached. Returns the new data, or None when the upstream is failing (the cached copy is left alone)."""
+
+        if not self.breaker.allow():
+            self.stats['short_circuited'] += 1
+            return None
+
+        try:
+            return self._request(path, transform)
+        except requests.HTTPError:
+            return None
+
+    def _revalidate(self, path, transform):
+        if self.refresher.submit(path, lambda: self.refresh(path, transform)):
+            self.stats['revalidations'] += 1
+
+    def _request(self, path, transform):
+        """calls PokeAPI for path and caches the (transformed) response. Returns None when the upstream failed and raises NotFound (remembering it) for a 404."""
+
+        self.stats['requests'] += 1
+        start = time.perf_counter()
+
+        try:
+            res = self.session.get(f'{self.base_url}/{path}/', timeout=self.timeout)
+        except requests.RequestException:
+            return self._failed()
+        finally:
+            seconds = time.perf_counter() - start
+            self.latency.record(seconds)
+            metrics.observe_pokeapi(seconds)
+
+        # a 404 for a misspelled name is a perfectly healthy upstream.
+        if res.status_code == 404:
+            self.breaker.record_success()
+            self.stats['not_found'] += 1
+            self.missing.set(path, True)
+            raise NotFound(path, response=res)
+
+        # rate limited (429) or any other error: serve the stale copy or fail over like an outage instead of raising into the view.
+        if res.status_code >= 400:
+            return self._failed()
+
+        self.breaker.record_success()
+
+        data = res.json()
+
+        if transform is not None:
+            data = transform(data)
+
+        self.cache.set(path, data)
+        return data
+
+    def _failed(self):
+        self.stats['failures'] += 1
+        self.breaker.record_failure()
+        return None
+
+    def _fallback(self, path):
+        data = self.cache.get_stale(path)
+
+        if data is None:
+            raise UpstreamUnavailable(path)
+
+        self.stats['stale_served'] += 1
+        return data
+
+    def get_pokemon(self, name):
+        """returns the `PokemonRecord` for a single pokemon."""
+
+        return PokemonRecord.from_json(self.fetch(f'pokemon/{name}', PokemonRecord.from_api))
+
+    def get_pokedex(self, name):
+        """returns the data for a pokedex including all of its entries."""
+
+        return self.fetch(f'pokedex/{name}')
+
+
+# shared client used by the routes. Size, ttl and the optional disk tier are set through environment variables so they can be tuned per deployment.
+client = PokeAPIClient(
+    cache=TTLCache(
+        max_size=int(os.environ.get('POKEAPI_CACHE_SIZE', 1024)),
+        ttl=int(os.environ.get('POKEAPI_CACHE_TTL', 60 * 60 * 24)),
+        disk_dir=os.environ.get('POKEAPI_CACHE_DIR'),
+    ),
+    refresher=BackgroundRefresher(max_workers=POKEAPI_REFRESH_WORKERS) if POKEAPI_REFRESH_WORKERS else None,
+)
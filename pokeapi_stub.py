@@ -0,0 +1,136 @@
+"""local stand-in for PokeAPI used by the tests.
+
+The stub serves canned json responses from a dict keyed by path (for example 'pokemon/charmander') and counts every request it receives so tests can check how often the upstream was actually hit.
+
+Recorded responses live in fixtures/ as <path>.json (fixtures/pokemon/charmander.json is served as /pokemon/charmander/). More can be recorded from the real API with:
+
+    python pokeapi_stub.py record pokemon/squirtle pokedex/johto
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """returns {path: json} for every .json file below directory."""
+
+    responses = {}
+
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith('.json'):
+                full_path = os.path.join(root, filename)
+                path = os.path.relpath(full_path, directory)[:-len('.json')].replace(os.sep, '/')
+
+                with open(full_path) as f:
+                    responses[path] = json.load(f)
+
+    return responses
+
+
+def record(paths, directory=FIXTURES_DIR, base_url='https://pokeapi.co/api/v2'):
+    """downloads each path from PokeAPI and saves it as a fixture."""
+
+    for path in paths:
+        res = requests.get(f'{base_url}/{path}/', timeout=(3.05, 30))
+        res.raise_for_status()
+
+        target = os.path.join(directory, *path.split('/')) + '.json'
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with open(target, 'w') as f:
+            json.dump(res.json(), f, indent=1)
+
+        print(f'recorded {path} -> {target}')
+
+
+class PokeAPIStub:
+    """runs a tiny http server on a random local port in a background thread."""
+
+    @classmethod
+    def from_fixtures(cls, directory=FIXTURES_DIR, **kwargs):
+        """stub serving every recorded response in directory."""
+
+        return cls(load_fixtures(directory), **kwargs)
+
+    def __init__(self, responses=None, delay=0):
+        self.responses = responses or {}
+        self.delay = delay
+        # when set, every request is answered with this status code (used to simulate an outage).
+        self.status = None
+        self.requests = Counter()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.strip('/')
+                stub.requests[path] += 1
+
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                if stub.status is not None:
+                    self.send_response(stub.status)
+                    self.end_headers()
+                    return
+
+                if path not in stub.responses:
+                    self.send_response(404)
+                    self.end_headers()
+                    self.wfile.write(b'Not Found')
+                    return
+
+                body = json.dumps(stub.responses[path]).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record PokeAPI responses as test fixtures.')
+    parser.add_argument('command', choices=['record'])
+    parser.add_argument('paths', nargs='+', help='api paths such as pokemon/charmander or pokedex/hoenn')
+    args = parser.parse_args()
+
+    record(args.paths)
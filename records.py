@@ -0,0 +1,68 @@
+"""compact representation of the pokemon data shown on the detail page.
+
+A full PokeAPI /pokemon/<name> response can be hundreds of KB (every move lists its learn method for every game version) while the page only shows a handful of names and numbers. `PokemonRecord` keeps exactly those fields in tuples, which is what gets cached and what the template receives."""
+
+from typing import NamedTuple, Optional, Tuple
+
+
+class PokemonRecord(NamedTuple):
+    """the fields of a pokemon that the detail page renders."""
+
+    name: str
+    types: Tuple[str, ...]
+    stats: Tuple[Tuple[str, int], ...]
+    abilities: Tuple[str, ...]
+    moves: Tuple[str, ...]
+    base_experience: Optional[int]
+    front_default: Optional[str]
+    front_shiny: Optional[str]
+
+    @classmethod
+    def from_api(cls, data):
+        """extracts the record from a PokeAPI /pokemon/<name> response."""
+
+        return cls(
+            name=data['name'],
+            types=tuple(t['type']['name'] for t in sorted(data['types'], key=lambda t: t['slot'])),
+            stats=tuple((s['stat']['name'], s['base_stat']) for s in data['stats']),
+            abilities=tuple(a['ability']['name'] for a in sorted(data['abilities'], key=lambda a: a['slot'])),
+            # the api can list the same move more than once.
+            moves=tuple(dict.fromkeys(m['move']['name'] for m in data['moves'])),
+            base_experience=data['base_experience'],
+            front_default=data['sprites']['front_default'],
+            front_shiny=data['sprites']['front_shiny'],
+        )
+
+    @classmethod
+    def from_model(cls, pokemon):
+        """builds the record from a Pokemon row whose details were stored by ingest.py."""
+
+        return cls(
+            name=pokemon.pokemon_name,
+            types=tuple(t.type.name for t in pokemon.types),
+            stats=tuple((s.stat.name, s.base_stat) for s in pokemon.stats),
+            abilities=tuple(a.ability.name for a in pokemon.abilities),
+            moves=tuple(m.move.name for m in pokemon.moves),
+            base_experience=pokemon.base_experience,
+            front_default=pokemon.sprite_url('front_default'),
+            front_shiny=pokemon.sprite_url('front_shiny'),
+        )
+
+    @classmethod
+    def unavailable(cls, pokemon):
+        """record with only the locally stored name and sprites, used when the details cannot be loaded."""
+
+        return cls(pokemon.pokemon_name, (), (), (), (), None,
+                   pokemon.sprite_url('front_default'), pokemon.sprite_url('front_shiny'))
+
+    @classmethod
+    def from_json(cls, value):
+        """rebuilds a record from its json form (nested lists), as read back from the disk cache."""
+
+        if isinstance(value, cls):
+            return value
+
+        name, types, stats, abilities, moves, base_experience, front_default, front_shiny = value
+
+        return cls(name, tuple(types), tuple(tuple(stat) for stat in stats), tuple(abilities), tuple(moves),
+                   base_experience, front_default, front_shiny)
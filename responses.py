@@ -0,0 +1,116 @@
+"""helpers for caching rendered html and for working on whole responses after a view has returned."""
+
+import gzip
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, make_response, render_template, request, session
+from markupsafe import Markup
+
+from cache import TTLCache
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html',
+    'text/css',
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+}
+
+# compressing tiny bodies costs more than it saves.
+MIN_COMPRESS_SIZE = 500
+
+# rendered html for the parts of pages that are the same for every visitor (pokemon data, pokedex lists, ...) keyed by a name chosen by the view.
+fragment_cache = TTLCache(max_size=int(os.environ.get('FRAGMENT_CACHE_SIZE', 2048)), ttl=60 * 10)
+
+
+def render_fragment(key, template, ttl=None, load=None, **context):
+    """renders template (or returns the cached copy under key) as Markup that can be dropped into a page template.
+
+    `load` is an optional function returning more template context. It is only called when the fragment is not cached, so expensive queries can be skipped on a hit.
+
+    Fragments must not depend on the current user, flashed messages or anything else that differs between requests."""
+
+    html = fragment_cache.get(key)
+
+    if html is None:
+        if load is not None:
+            context.update(load())
+
+        html = render_template(template, **context)
+        fragment_cache.set(key, html, ttl=ttl)
+
+    return Markup(html)
+
+
+def conditional(max_age=60):
+    """decorator for read-only views that adds a strong ETag to 200 responses and answers a matching If-None-Match with an empty 304.
+
+    Visitors without a session (not logged in, no flashed messages) get `Cache-Control: public` so a reverse proxy can serve the page for `max_age` seconds. Everyone else gets `private, no-cache`, which still lets their browser revalidate with the ETag.
+
+    Responses the view already gave a Cache-Control header (`no_store` on a degraded page, ...) are passed through untouched."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = make_response(view(*args, **kwargs))
+
+            if (request.method != 'GET'
+                    or response.status_code != 200
+                    or response.direct_passthrough
+                    or 'Cache-Control' in response.headers):
+                return response
+
+            etag = hashlib.sha1(response.get_data()).hexdigest()
+
+            if not session:
+                response.cache_control.public = True
+                response.cache_control.max_age = max_age
+            else:
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+
+            # gzip_response changes the etag of compressed bodies, both forms identify the same page.
+            if request.if_none_match.contains(etag) or request.if_none_match.contains(f'{etag}-gzip'):
+                response.status_code = 304
+                response.set_data(b'')
+                # the client keeps using its copy, which may be the gzipped one.
+                if request.if_none_match.contains(f'{etag}-gzip'):
+                    etag = f'{etag}-gzip'
+                    response.vary.add('Accept-Encoding')
+
+            response.set_etag(etag)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def gzip_response(response):
+    """after_request hook that gzips html/json/css/js responses for clients that accept it."""
+
+    if (current_app.debug
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()
+            or response.direct_passthrough
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+
+    # a strong etag has to be different for every encoding of the same page.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f'{etag}-gzip')
+
+    return response
@@ -0,0 +1,189 @@
+"""in-memory pokemon search used by the /search typeahead endpoint.
+
+The index is built from the pokemon table once per worker and answers queries without touching the database:
+
+* a prefix trie finds every name starting with the query ("char" -> charmander, charmeleon, charizard).
+* a trigram index finds names that contain the query or are close to it ("mander", "pikachoo").
+
+Results can be filtered by type and generation, both of which come from the locally stored pokemon details."""
+
+import threading
+import time
+from collections import defaultdict
+from typing import NamedTuple, Optional, Tuple
+
+
+class SearchEntry(NamedTuple):
+    id: int
+    name: str
+    generation: Optional[int]
+    types: Tuple[str, ...]
+
+
+def normalize(text):
+    return text.strip().lower().replace(' ', '-')
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrieNode:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        # every entry whose name passes through this node, shortest name first (mew before mewtwo).
+        self.entries = []
+
+
+class PokemonSearchIndex:
+    """prefix trie plus trigram index over pokemon names."""
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda entry: entry.id)
+        self.root = TrieNode()
+        self.grams = defaultdict(set)
+
+        # adding names shortest first means every node's entries are already in the order search() returns them.
+        by_length = sorted(range(len(self.entries)), key=lambda position: len(self.entries[position].name))
+
+        for position in by_length:
+            node = self.root
+            for char in self.entries[position].name:
+                node = node.children.setdefault(char, TrieNode())
+                node.entries.append(position)
+
+        for position, entry in enumerate(self.entries):
+            for gram in trigrams(entry.name):
+                self.grams[gram].add(position)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _prefix_matches(self, query):
+        node = self.root
+
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        return node.entries
+
+    def _trigram_matches(self, query):
+        """returns entry positions ordered by how many of the query's trigrams their name shares."""
+
+        query_grams = trigrams(query)
+        counts = defaultdict(int)
+
+        for gram in query_grams:
+            for position in self.grams.get(gram, ()):
+                counts[position] += 1
+
+        # at least a third of the query has to match so very short overlaps are not returned.
+        threshold = max(1, len(query_grams) // 3)
+        matches = [(count, position) for position, count in counts.items() if count >= threshold]
+        matches.sort(key=lambda match: (-match[0], match[1]))
+
+        return [position for _, position in matches]
+
+    def search(self, query, type=None, generation=None, limit=10):
+        """returns up to `limit` entries ranked exact match first, then names starting with the query, then similar names."""
+
+        query = normalize(query)
+
+        if not query:
+            return []
+
+        def wanted(entry):
+            return ((type is None or type in entry.types)
+                    and (generation is None or entry.generation == generation))
+
+        results = []
+        seen = set()
+
+        def add(positions):
+            for position in positions:
+                if len(results) >= limit:
+                    return
+                entry = self.entries[position]
+                if position not in seen and wanted(entry):
+                    seen.add(position)
+                    results.append(entry)
+
+        # exact name first, then shorter names before longer ones.
+        add(self._prefix_matches(query))
+
+        if len(results) < limit and len(query) >= 3:
+            add(self._trigram_matches(query))
+
+        return results
+
+
+class SearchIndexHolder:
+    """builds the index lazily on first use and rebuilds it after `ttl` seconds or when `clear` is called (for example after the pokemon table changes)."""
+
+    def __init__(self, loader, ttl=60 * 10, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.clock = clock
+
+        self._index = None
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        index = self._index
+
+        if index is not None and self.clock() - self._built_at < self.ttl:
+            return index
+
+        with self._lock:
+            if self._index is None or self.clock() - self._built_at >= self.ttl:
+                self._index = PokemonSearchIndex(self.loader())
+                self._built_at = self.clock()
+
+            return self._index
+
+    def clear(self):
+        self._index = None
+
+
+class KnownNames:
+    """set of every pokemon name, so routes can turn away unknown names without a query or a PokeAPI call.
+
+    Loaded lazily and reloaded after `ttl` seconds or when `clear` is called. A name that is not in the set also triggers a reload, at most once every `recheck` seconds, so pokemon added by seed.py in another process are picked up quickly while a crawler requesting junk names still causes at most one query per `recheck` seconds."""
+
+    def __init__(self, loader, ttl=60 * 10, recheck=60, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.recheck = recheck
+        self.clock = clock
+
+        self._names = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _load(self, max_age):
+        with self._lock:
+            if self._names is None or self.clock() - self._loaded_at >= max_age:
+                self._names = frozenset(self.loader())
+                self._loaded_at = self.clock()
+
+            return self._names
+
+    def __contains__(self, name):
+        names = self._names
+
+        if names is None or self.clock() - self._loaded_at >= self.ttl:
+            names = self._load(self.ttl)
+
+        if name in names:
+            return True
+
+        return name in self._load(self.recheck)
+
+    def clear(self):
+        self._names = None
@@ -1,8 +1,118 @@
-from app import db
-from models import Pokemon
+"""brings the database schema up to date, syncs the national dex into the pokemon table and stores every regional pokedex.
 
-db.drop_all()
-db.create_all()
+    python seed.py                                    # everything from PokeAPI
+    python seed.py --fixture fixtures/pokedex/national.json --pokedex-dir fixtures/pokedex
+                                                      # offline, from saved /pokedex/<name> responses
+    python seed.py --batch-size 100
 
-Pokemon.get_national_dex()
-db.session.commit()
+Schema changes go through the migrations in migrations/ and pokemon are upserted by name, so re-running this file never drops users or comments and keeps every existing pokemon id. Each batch is committed on its own and the rows inserted / updated / left unchanged are reported per batch.
+
+Regional pokedexes are stored in full every run (one transaction each) so the pokedex pages never call PokeAPI.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from flask_migrate import upgrade
+
+from app import create_app, init_migrations
+from cache import TTLCache
+from models import Pokedex, Pokemon, db
+import pokeapi
+from pokeapi import PokeAPIClient
+
+
+def national_dex_entries(fixture=None):
+    """yields (national id, name) for every entry of the national pokedex, read from `fixture` (same json as the PokeAPI endpoint) when given."""
+
+    if fixture is not None:
+        with open(fixture) as f:
+            data = json.load(f)
+    else:
+        data = pokeapi.client.get_pokedex('national')
+
+    for item in data['pokemon_entries']:
+        yield item['entry_number'], item['pokemon_species']['name']
+
+
+def batches(entries, size):
+    batch = []
+
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def sync_national_dex(fixture=None, batch_size=200):
+    """upserts the national dex in batches and returns the total (inserted, updated, unchanged) counts."""
+
+    totals = [0, 0, 0]
+
+    for number, batch in enumerate(batches(national_dex_entries(fixture), batch_size), start=1):
+        start = time.perf_counter()
+
+        inserted, updated = Pokemon.upsert_national_dex(batch)
+        db.session.commit()
+
+        unchanged = len(batch) - inserted - updated
+        totals = [totals[0] + inserted, totals[1] + updated, totals[2] + unchanged]
+
+        print(f'batch {number}: {inserted} inserted, {updated} updated, {unchanged} unchanged in {time.perf_counter() - start:.3f}s')
+
+    print(f'done: {totals[0]} inserted, {totals[1]} updated, {totals[2]} unchanged')
+    return tuple(totals)
+
+
+def regional_pokedexes(directory=None):
+    """yields every regional pokedex response, read from the json files in `directory` when given and from PokeAPI otherwise. The national dex is left out, it is stored in the pokemon table itself."""
+
+    if directory is not None:
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.json') and filename != 'national.json':
+                with open(os.path.join(directory, filename)) as f:
+                    yield json.load(f)
+        return
+
+    # every response is read once, there is no point keeping them in a cache.
+    client = PokeAPIClient(cache=TTLCache(max_size=0))
+    res = client.session.get(f'{client.base_url}/pokedex/', params={'limit': 1000}, timeout=client.timeout)
+    res.raise_for_status()
+
+    for item in res.json()['results']:
+        if item['name'] != 'national':
+            yield client.get_pokedex(item['name'])
+
+
+def sync_pokedexes(directory=None):
+    """stores every regional pokedex, one transaction per pokedex."""
+
+    for data in regional_pokedexes(directory):
+        start = time.perf_counter()
+
+        stored, skipped = Pokedex.store(data)
+        db.session.commit()
+
+        print(f'pokedex {data["name"]}: {stored} entries stored, {skipped} skipped in {time.perf_counter() - start:.3f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrate the database and sync the national dex into the pokemon table.')
+    parser.add_argument('--fixture', help='path to a saved /pokedex/national json response to use instead of calling PokeAPI')
+    parser.add_argument('--batch-size', type=int, default=200, help='number of pokemon upserted per transaction')
+    parser.add_argument('--pokedex-dir', help='directory of saved /pokedex/<name> json responses to use instead of calling PokeAPI')
+    args = parser.parse_args()
+
+    app = create_app()
+    init_migrations(app)
+
+    with app.app_context():
+        upgrade()
+        sync_national_dex(fixture=args.fixture, batch_size=args.batch_size)
+        sync_pokedexes(directory=args.pokedex_dir)
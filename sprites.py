@@ -0,0 +1,29 @@
+"""local copy of the pokemon sprite images for the optional sprite proxy route.
+
+Sprites never change for a given pokemon, so each image is downloaded once, kept on disk and then served by the app with long lived cache headers."""
+
+import os
+import tempfile
+
+import requests
+
+SPRITE_CACHE_DIR = os.environ.get('SPRITE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'poke-forum-sprites'))
+
+
+def get_sprite_path(pokemon_id, variant, url):
+    """returns the path to the cached image, downloading it first when it is not on disk yet."""
+
+    os.makedirs(SPRITE_CACHE_DIR, exist_ok=True)
+    path = os.path.join(SPRITE_CACHE_DIR, f'{pokemon_id}-{variant}.png')
+
+    if not os.path.exists(path):
+        res = requests.get(url, timeout=10)
+        res.raise_for_status()
+
+        # writing to a temp file first so a half downloaded image is never served.
+        fd, tmp_path = tempfile.mkstemp(dir=SPRITE_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(res.content)
+        os.replace(tmp_path, path)
+
+    return path
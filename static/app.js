@@ -3,34 +3,74 @@ console.warn(
 	'Hi there! It seems that you have found the developer tools. Notice how I said DEVELOPER in the previous sentence. If you are NOT a developer or you do not know what these tools are used for, kindly press F12 to leave this view. Thank you!'
 );
 
-// Once the DOM is ready, we are going to make a call to the API to get the pokemon sprites so that users can see little images in the master pokemon generations view.
-$(document).ready(function() {
-	makeImgCall();
-});
-
 // Enabling tool tip functionality from Bootstrap docs: https://getbootstrap.com/docs/5.1/components/tooltips/
 let tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
 let tooltipList = tooltipTriggerList.map(function(tooltipTriggerEl) {
 	return new bootstrap.Tooltip(tooltipTriggerEl);
 });
 
-// selecting all class attributes from master pokemon generations view.
-const allPokemon = document.querySelectorAll('.pokemon');
+// The moves section on the pokemon detail page starts out empty. The first time it is opened we ask the server for the moves and fill in the list.
+const movesList = document.querySelector('#moves-list');
+
+if (movesList) {
+	document.querySelector('#collapseMoves').addEventListener('show.bs.collapse', loadMoves, { once: true });
+}
+
+async function loadMoves() {
+	movesList.innerHTML = '';
+
+	try {
+		const res = await axios.get(movesList.dataset.movesUrl);
+		const moves = res.data.moves;
 
-// Function makes API call for all pokemon that are listed in the master pokemon generation view and takes their ID to find the matching sprite. New image tag is then created and appended to the master generations view.
-async function makeImgCall() {
-	for (let i = 0; i < allPokemon.length; i++) {
-		const res = await axios.get(`https://pokeapi.co/api/v2/pokemon/${allPokemon[i].id}/`);
-		const data = res.data;
-		const imgSrc = data.sprites.front_default;
+		if (!moves.length) {
+			throw new Error('no moves');
+		}
+
+		for (let move of moves) {
+			const newLiTag = document.createElement('li');
+			newLiTag.classList.add('list-group-item');
+			newLiTag.innerText = move.charAt(0).toUpperCase() + move.slice(1);
+			movesList.append(newLiTag);
+		}
+	} catch (err) {
+		const newPTag = document.createElement('p');
+		newPTag.classList.add('text-warning');
+		newPTag.innerText = 'No Information Available';
+		movesList.append(newPTag);
+	}
+}
+
+// Typeahead for the navbar search box. Suggestions come from /search and are shown through the input's datalist.
+const searchInput = document.querySelector('#pokemon-search');
+let searchTimer;
+
+if (searchInput) {
+	searchInput.addEventListener('input', function() {
+		clearTimeout(searchTimer);
+		searchTimer = setTimeout(loadSuggestions, 150);
+	});
+}
+
+async function loadSuggestions() {
+	const results = document.querySelector('#pokemon-search-results');
+	const query = searchInput.value.trim();
+
+	if (!query) {
+		results.innerHTML = '';
+		return;
+	}
 
-		let parent = allPokemon[i].parentElement;
-		const newImgTag = document.createElement('img');
-		newImgTag.setAttribute('src', imgSrc);
-		newImgTag.setAttribute('alt', 'pokemon-default-image');
-		newImgTag.setAttribute('height', 48);
-		newImgTag.setAttribute('width', 48);
+	try {
+		const res = await axios.get('/search', { params: { q: query } });
+		results.innerHTML = '';
 
-		parent.append(newImgTag);
+		for (let pokemon of res.data.results) {
+			const option = document.createElement('option');
+			option.value = pokemon.name;
+			results.append(option);
+		}
+	} catch (err) {
+		results.innerHTML = '';
 	}
 }
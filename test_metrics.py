@@ -0,0 +1,78 @@
+"""tests for the request metrics and /metrics endpoint ONLY. These use a small app of their own instead of the main application."""
+
+from unittest import TestCase
+
+from flask import Flask, render_template_string
+
+import metrics
+
+
+class MetricsTestCase(TestCase):
+    """testing request timings, the prometheus output and Server-Timing headers."""
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.config['SERVER_TIMING'] = True
+        metrics.init_app(app)
+        self.app = app
+
+        @app.route('/hello')
+        def hello():
+            metrics.observe_pokeapi(0.02)
+            return render_template_string('hello {{ name }}', name='pikachu')
+
+        self.client = app.test_client()
+
+    def test_histogram_render(self):
+        """buckets should be cumulative and end with +Inf, sum and count."""
+
+        histogram = metrics.Histogram('test_seconds', 'testing.', ('route',), buckets=(.1, 1))
+        histogram.observe(.05, 'home')
+        histogram.observe(.5, 'home')
+        histogram.observe(5, 'home')
+
+        lines = histogram.render()
+
+        self.assertIn('pokeforum_test_seconds_bucket{route="home",le="0.1"} 1', lines)
+        self.assertIn('pokeforum_test_seconds_bucket{route="home",le="1"} 2', lines)
+        self.assertIn('pokeforum_test_seconds_bucket{route="home",le="+Inf"} 3', lines)
+        self.assertIn('pokeforum_test_seconds_count{route="home"} 3', lines)
+
+    def test_request_recorded(self):
+        """requests show up on /metrics by endpoint together with registered stats."""
+
+        metrics.register_stats('test_cache', lambda: {'hits': 3})
+
+        self.client.get('/hello')
+        res = self.client.get('/metrics')
+        body = res.get_data(as_text=True)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('pokeforum_request_duration_seconds_count{endpoint="hello",method="GET",status="200"}', body)
+        self.assertIn('pokeforum_template_render_seconds_count', body)
+        self.assertIn('pokeforum_test_cache_hits 3.0', body)
+
+    def test_server_timing(self):
+        """the per request timings are sent back when SERVER_TIMING is on."""
+
+        res = self.client.get('/hello')
+
+        self.assertIn('pokeapi;dur=20.0', res.headers['Server-Timing'])
+        self.assertIn('app;dur=', res.headers['Server-Timing'])
+
+    def test_metrics_token(self):
+        """with METRICS_TOKEN set the endpoint needs the bearer token."""
+
+        self.app.config['METRICS_TOKEN'] = 'secret'
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        res = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(res.status_code, 200)
+
+    def test_metrics_hidden_without_required_token(self):
+        """when a token is required but none is configured, /metrics should not exist."""
+
+        self.app.config['METRICS_TOKEN'] = None
+        self.app.config['METRICS_REQUIRE_TOKEN'] = True
+
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
@@ -0,0 +1,35 @@
+"""unit tests for the password hashing module ONLY"""
+
+from unittest import TestCase
+
+import passwords
+
+
+class PasswordsTestCase(TestCase):
+    """testing hashing, checking and rehash detection. A low work factor keeps the tests fast."""
+
+    def test_hash_and_check(self):
+        """does a hashed password check out with the right password only?"""
+
+        hashed = passwords.hash_password('testing1234', rounds=4)
+
+        self.assertTrue(passwords.check_password(hashed, 'testing1234'))
+        self.assertFalse(passwords.check_password(hashed, 'Testing1234'))
+
+    def test_needs_rehash(self):
+        """are hashes made with a different work factor flagged for rehashing?"""
+
+        old_hash = passwords.hash_password('testing1234', rounds=4)
+        current_hash = passwords.hash_password('testing1234', rounds=passwords.BCRYPT_LOG_ROUNDS)
+
+        self.assertTrue(passwords.needs_rehash(old_hash))
+        self.assertFalse(passwords.needs_rehash(current_hash))
+
+    def test_stats(self):
+        """are hash timings being recorded?"""
+
+        count = passwords.stats['hash']['count']
+        passwords.hash_password('testing1234', rounds=4)
+
+        self.assertEqual(passwords.stats['hash']['count'], count + 1)
+        self.assertGreater(passwords.stats['hash']['seconds'], 0)
@@ -0,0 +1,352 @@
+"""tests for the PokeAPI cache layer ONLY. These run against a local stub server instead of pokeapi.co."""
+
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from cache import TTLCache
+from pokeapi import BackgroundRefresher, CircuitBreaker, NotFound, PokeAPIClient, UpstreamUnavailable
+from pokeapi_stub import PokeAPIStub
+from records import PokemonRecord
+
+CHARMANDER = {
+    'name': 'charmander',
+    'base_experience': 62,
+    'types': [{'slot': 1, 'type': {'name': 'fire'}}],
+    'stats': [{'base_stat': 39, 'effort': 0, 'stat': {'name': 'hp'}}],
+    'abilities': [{'slot': 1, 'is_hidden': False, 'ability': {'name': 'blaze'}}],
+    'moves': [{'move': {'name': 'scratch'}, 'version_group_details': [{'level_learned_at': 1}]}],
+    'sprites': {'front_default': 'front.png', 'front_shiny': 'shiny.png'},
+}
+
+
+class FakeClock:
+    """clock that only moves when the test tells it to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTestCase(TestCase):
+    """testing the in-process cache and the disk tier."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.disk_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    def test_hit_and_miss_counters(self):
+        """are hits and misses being counted?"""
+
+        cache = TTLCache(clock=self.clock)
+
+        self.assertIsNone(cache.get('pikachu'))
+        cache.set('pikachu', {'name': 'pikachu'})
+
+        self.assertEqual(cache.get('pikachu'), {'name': 'pikachu'})
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['misses'], 1)
+
+    def test_lru_eviction(self):
+        """does the least recently used entry get evicted once the cache is full?"""
+
+        cache = TTLCache(max_size=2, clock=self.clock)
+
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # touching 'a' makes 'b' the least recently used entry.
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        """are expired entries treated as misses?"""
+
+        cache = TTLCache(ttl=60, clock=self.clock)
+        cache.set('bulbasaur', 1)
+
+        self.clock.now += 61
+
+        self.assertIsNone(cache.get('bulbasaur'))
+        self.assertEqual(cache.stats['expirations'], 1)
+
+    def test_stale_reads(self):
+        """can expired entries still be read when asked for explicitly?"""
+
+        cache = TTLCache(ttl=60, clock=self.clock)
+        cache.set('bulbasaur', 1)
+
+        self.clock.now += 61
+
+        self.assertIsNone(cache.get('bulbasaur'))
+        self.assertEqual(cache.get_stale('bulbasaur'), 1)
+        self.assertIsNone(cache.get_stale('ivysaur'))
+
+    def test_disk_tier_survives_new_instance(self):
+        """can a brand new cache (like a restarted worker) read entries written by an old one?"""
+
+        TTLCache(disk_dir=self.disk_dir, clock=self.clock).set('squirtle', {'id': 7})
+
+        cache = TTLCache(disk_dir=self.disk_dir, clock=self.clock)
+
+        self.assertEqual(cache.get('squirtle'), {'id': 7})
+        self.assertEqual(cache.stats['disk_hits'], 1)
+
+    def test_disk_tier_expiry(self):
+        """expired entries on disk should not be served either."""
+
+        TTLCache(ttl=60, disk_dir=self.disk_dir, clock=self.clock).set('squirtle', 1)
+        self.clock.now += 61
+
+        self.assertIsNone(TTLCache(disk_dir=self.disk_dir, clock=self.clock).get('squirtle'))
+
+
+class PokeAPIClientTestCase(TestCase):
+    """testing the read-through client against the local stub."""
+
+    def setUp(self):
+        self.stub = PokeAPIStub({'pokemon/charmander': CHARMANDER})
+        self.stub.start()
+        self.clock = FakeClock()
+        self.client = PokeAPIClient(base_url=self.stub.url, cache=TTLCache(ttl=60, clock=self.clock), retries=0,
+                                    breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock))
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_repeat_calls_served_from_cache(self):
+        """the stub should only be hit once for two lookups of the same pokemon."""
+
+        first = self.client.get_pokemon('charmander')
+        second = self.client.get_pokemon('charmander')
+
+        self.assertEqual(first.name, 'charmander')
+        self.assertEqual(first, second)
+        self.assertEqual(self.stub.requests['pokemon/charmander'], 1)
+        self.assertEqual(self.client.cache.stats['hits'], 1)
+
+    def test_errors_are_not_cached(self):
+        """failed calls should raise and not leave anything behind in the cache."""
+
+        with self.assertRaises(Exception):
+            self.client.get_pokemon('missingno')
+
+        self.assertNotIn('pokemon/missingno', self.client.cache)
+
+    def test_not_found_is_remembered(self):
+        """a 404 should be raised again from the negative cache without another upstream call."""
+
+        for _ in range(3):
+            with self.assertRaises(NotFound):
+                self.client.get_pokemon('missingno')
+
+        self.assertEqual(self.stub.requests['pokemon/missingno'], 1)
+        self.assertEqual(self.client.stats['negative_hits'], 2)
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+        # and forgotten after the negative ttl.
+        self.clock.now += 60 * 60
+        with self.assertRaises(NotFound):
+            self.client.get_pokemon('missingno')
+
+        self.assertEqual(self.stub.requests['pokemon/missingno'], 2)
+
+    def test_stale_data_served_when_upstream_fails(self):
+        """an expired copy should be served when the upstream is down."""
+
+        self.client.get_pokemon('charmander')
+        self.clock.now += 61
+        self.stub.status = 503
+
+        self.assertEqual(self.client.get_pokemon('charmander').name, 'charmander')
+        self.assertEqual(self.client.stats['stale_served'], 1)
+
+    def test_upstream_unavailable_without_cache(self):
+        """with nothing cached, an outage should raise UpstreamUnavailable."""
+
+        self.stub.status = 503
+
+        with self.assertRaises(UpstreamUnavailable):
+            self.client.get_pokemon('charmander')
+
+    def test_rate_limited_upstream(self):
+        """a 429 should be handled like an outage, serving the stale copy or raising UpstreamUnavailable."""
+
+        self.stub.status = 429
+
+        with self.assertRaises(UpstreamUnavailable):
+            self.client.get_pokemon('charmander')
+
+        # with a cached copy the expired one is served instead.
+        self.stub.status = None
+        self.client.get_pokemon('charmander')
+        self.clock.now += 61
+        self.stub.status = 429
+
+        self.assertEqual(self.client.get_pokemon('charmander').name, 'charmander')
+        self.assertEqual(self.client.stats['stale_served'], 1)
+        self.assertNotIn('pokemon/charmander', self.client.missing)
+
+    def test_circuit_breaker(self):
+        """once the breaker opens the stub should not be called again until the reset timeout passes."""
+
+        self.stub.status = 503
+
+        for _ in range(3):
+            with self.assertRaises(UpstreamUnavailable):
+                self.client.get_pokemon('charmander')
+
+        self.assertEqual(self.stub.requests['pokemon/charmander'], 2)
+        self.assertEqual(self.client.breaker.state, 'open')
+
+        # after the timeout a trial call goes through and closes the breaker again.
+        self.stub.status = None
+        self.clock.now += 31
+
+        self.assertEqual(self.client.get_pokemon('charmander').name, 'charmander')
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_only_record_is_cached(self):
+        """the cache should hold the compact record, not the full api response."""
+
+        self.client.get_pokemon('charmander')
+        cached = self.client.cache.get('pokemon/charmander')
+
+        self.assertEqual(cached.types, ('fire',))
+        self.assertEqual(cached.stats, (('hp', 39),))
+        self.assertEqual(cached.moves, ('scratch',))
+
+
+class StaleWhileRevalidateTestCase(TestCase):
+    """testing the background refresh of entries that are about to expire or just did."""
+
+    def setUp(self):
+        self.stub = PokeAPIStub({'pokemon/charmander': CHARMANDER})
+        self.stub.start()
+        self.clock = FakeClock()
+        self.client = PokeAPIClient(base_url=self.stub.url, cache=TTLCache(ttl=60, clock=self.clock), retries=0,
+                                    breaker=CircuitBreaker(clock=self.clock), refresher=BackgroundRefresher(max_workers=1),
+                                    refresh_ahead=10, max_stale=30)
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_fresh_entry_not_refreshed(self):
+        """reads well before expiry should not schedule anything."""
+
+        self.client.get_pokemon('charmander')
+        self.client.get_pokemon('charmander')
+        self.client.refresher.wait()
+
+        self.assertEqual(self.stub.requests['pokemon/charmander'], 1)
+        self.assertEqual(self.client.stats['revalidations'], 0)
+
+    def test_entry_evicted_during_read(self):
+        """an entry evicted between the cache hit and the expiry check should still be served, without a refresh."""
+
+        self.client.get_pokemon('charmander')
+        self.client.cache.expires_in = lambda key: None
+
+        self.assertEqual(self.client.get_pokemon('charmander').name, 'charmander')
+        self.assertEqual(self.client.stats['revalidations'], 0)
+
+    def test_refresh_ahead_of_expiry(self):
+        """an entry close to expiry should be served from cache and replaced in the background."""
+
+        self.client.get_pokemon('charmander')
+        self.clock.now += 55
+
+        self.assertEqual(self.client.get_pokemon('charmander').name, 'charmander')
+        self.client.refresher.wait()
+
+        self.assertEqual(self.stub.requests['pokemon/charmander'], 2)
+        self.assertEqual(self.client.cache.expires_in('pokemon/charmander'), 60)
+
+    def test_expired_entry_served_stale(self):
+        """a recently expired entry should be returned straight away, not after a round trip."""
+
+        self.client.get_pokemon('charmander')
+        self.clock.now += 70
+
+        self.assertEqual(self.client.get_pokemon('charmander').name, 'charmander')
+        self.assertEqual(self.client.stats['stale_served'], 1)
+        self.client.refresher.wait()
+
+        self.assertEqual(self.stub.requests['pokemon/charmander'], 2)
+        self.assertIsNotNone(self.client.cache.get('pokemon/charmander'))
+
+    def test_too_stale_fetched_in_request(self):
+        """entries expired for longer than max_stale should be fetched before answering."""
+
+        self.client.get_pokemon('charmander')
+        self.clock.now += 100
+
+        self.client.get_pokemon('charmander')
+
+        self.assertEqual(self.client.stats['stale_served'], 0)
+        self.assertEqual(self.client.stats['revalidations'], 0)
+        self.assertEqual(self.stub.requests['pokemon/charmander'], 2)
+
+    def test_failed_refresh_keeps_cached_copy(self):
+        """a refresh during an outage should leave the old entry in place."""
+
+        self.client.get_pokemon('charmander')
+        self.clock.now += 55
+        self.stub.status = 503
+
+        self.client.get_pokemon('charmander')
+        self.client.refresher.wait()
+
+        self.assertEqual(self.client.cache.get('pokemon/charmander').name, 'charmander')
+
+
+class BackgroundRefresherTestCase(TestCase):
+    """testing the refresh job queue on its own."""
+
+    def test_dedupes_and_bounds_pending_jobs(self):
+        """a key should only be queued once and jobs past max_pending dropped."""
+
+        refresher = BackgroundRefresher(max_workers=1, max_pending=2)
+        release = threading.Event()
+        calls = []
+
+        def job(key):
+            def run():
+                release.wait(5)
+                calls.append(key)
+            return run
+
+        self.assertTrue(refresher.submit('a', job('a')))
+        self.assertFalse(refresher.submit('a', job('a')))
+        self.assertTrue(refresher.submit('b', job('b')))
+        self.assertFalse(refresher.submit('c', job('c')))
+
+        release.set()
+        refresher.wait()
+
+        self.assertEqual(sorted(calls), ['a', 'b'])
+        self.assertEqual(refresher.stats['dropped'], 1)
+
+
+class PokemonRecordTestCase(TestCase):
+    """testing the compact pokemon record."""
+
+    def test_json_round_trip(self):
+        """does a record survive being written to and read back from the disk cache?"""
+
+        disk_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, disk_dir, True)
+
+        record = PokemonRecord.from_api(CHARMANDER)
+        TTLCache(disk_dir=disk_dir).set('pokemon/charmander', record)
+
+        self.assertEqual(PokemonRecord.from_json(TTLCache(disk_dir=disk_dir).get('pokemon/charmander')), record)
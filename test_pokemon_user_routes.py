@@ -1,29 +1,20 @@
 """file is testing the pokemon routes for adding, editing, and removing comments both with and without auth."""
 
-from app import app, CURR_USER_KEY
-import os
-from unittest import TestCase
+from app import CURR_USER_KEY
+from testing import app, DatabaseTestCase
 
 from models import db, connect_db, User, Comment, Pokemon
 from flask import get_flashed_messages, session
 
-os.environ['DATABASE_URL'] = "postgresql:///pokeapi_db"
 
-db.drop_all()
-db.create_all()
-
-Pokemon.get_national_dex()
-db.session.commit()
-
-app.config['WTF_CSRF_ENABLED'] = False
-
-
-class TestPokemonViews(TestCase):
+class TestPokemonViews(DatabaseTestCase):
     """tests for all pokemon routes that take user input."""
 
     def setUp(self):
         """Create test client, add sample data."""
 
+        super().setUp()
+
         User.query.delete()
         Comment.query.delete()
 
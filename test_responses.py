@@ -0,0 +1,108 @@
+"""tests for the response helpers (fragment cache, etags and gzip) ONLY. These use a small app of their own instead of the main application."""
+
+import gzip
+from unittest import TestCase
+
+from flask import Flask, make_response, session
+
+import responses
+
+
+class ResponsesTestCase(TestCase):
+    """testing conditional GET handling and compression."""
+
+    def setUp(self):
+        responses.fragment_cache.clear()
+
+        app = Flask(__name__)
+        app.config['SECRET_KEY'] = 'testing'
+        app.after_request(responses.gzip_response)
+
+        self.renders = 0
+
+        @app.route('/page')
+        @responses.conditional(max_age=120)
+        def page():
+            self.renders += 1
+            return 'pokemon ' * 200
+
+        @app.route('/login')
+        @responses.conditional()
+        def login():
+            session['curr_user'] = 1
+            return 'logged in'
+
+        @app.route('/degraded')
+        @responses.conditional()
+        def degraded():
+            response = make_response('pokemon ' * 200)
+            response.cache_control.no_store = True
+            return response
+
+        self.client = app.test_client()
+
+    def test_etag_and_not_modified(self):
+        """does a matching If-None-Match get an empty 304?"""
+
+        res = self.client.get('/page')
+        etag = res.headers['ETag']
+
+        res = self.client.get('/page', headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    def test_public_cache_control_for_anonymous(self):
+        """visitors without a session should get a publicly cacheable page."""
+
+        res = self.client.get('/page')
+
+        self.assertIn('public', res.headers['Cache-Control'])
+        self.assertIn('max-age=120', res.headers['Cache-Control'])
+
+    def test_view_cache_control_kept(self):
+        """a view that set its own Cache-Control (no-store on a degraded page) should not be made public or get an etag."""
+
+        res = self.client.get('/degraded')
+
+        self.assertEqual(res.headers['Cache-Control'], 'no-store')
+        self.assertNotIn('ETag', res.headers)
+
+    def test_private_cache_control_with_session(self):
+        """pages for visitors with a session must not be shared by a proxy."""
+
+        self.client.get('/login')
+        res = self.client.get('/login')
+
+        self.assertIn('private', res.headers['Cache-Control'])
+
+    def test_gzip(self):
+        """are large responses compressed and given their own etag?"""
+
+        plain = self.client.get('/page')
+        res = self.client.get('/page', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.data), plain.data)
+        self.assertNotEqual(res.headers['ETag'], plain.headers['ETag'])
+
+        # the gzip etag should still revalidate.
+        res = self.client.get('/page', headers={'Accept-Encoding': 'gzip', 'If-None-Match': res.headers['ETag']})
+        self.assertEqual(res.status_code, 304)
+
+    def test_render_fragment_cached(self):
+        """the load function should only run when the fragment is not cached."""
+
+        app = Flask(__name__, template_folder='templates')
+        calls = []
+
+        def load():
+            calls.append(1)
+            return {'entries': [], 'name': 'kanto'}
+
+        with app.test_request_context():
+            first = responses.render_fragment('pokedex:kanto', 'pokemon/_pokedex-entries.html', load=load)
+            second = responses.render_fragment('pokedex:kanto', 'pokemon/_pokedex-entries.html', load=load)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
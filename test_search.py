@@ -0,0 +1,104 @@
+"""tests for the in-memory pokemon search index ONLY. No database is needed, entries are built by hand."""
+
+from unittest import TestCase
+
+from search import KnownNames, PokemonSearchIndex, SearchEntry, SearchIndexHolder
+
+ENTRIES = [
+    SearchEntry(4, 'charmander', 1, ('fire',)),
+    SearchEntry(5, 'charmeleon', 1, ('fire',)),
+    SearchEntry(6, 'charizard', 1, ('fire', 'flying')),
+    SearchEntry(25, 'pikachu', 1, ('electric',)),
+    SearchEntry(150, 'mewtwo', 1, ('psychic',)),
+    SearchEntry(151, 'mew', 1, ('psychic',)),
+    SearchEntry(172, 'pichu', 2, ('electric',)),
+    SearchEntry(390, 'chimchar', 4, ('fire',)),
+    SearchEntry(785, 'tapu-koko', 7, ('electric', 'fairy')),
+]
+
+
+class SearchIndexTestCase(TestCase):
+    """testing ranking and filters of the search index."""
+
+    def setUp(self):
+        self.index = PokemonSearchIndex(ENTRIES)
+
+    def names(self, *args, **kwargs):
+        return [entry.name for entry in self.index.search(*args, **kwargs)]
+
+    def test_prefix(self):
+        """names starting with the query come first, shortest first."""
+
+        self.assertEqual(self.names('char')[:3], ['charizard', 'charmander', 'charmeleon'])
+        self.assertEqual(self.names('mew'), ['mew', 'mewtwo'])
+
+    def test_normalizes_query(self):
+        """case and spaces should not matter."""
+
+        self.assertEqual(self.names('  Tapu Koko ')[0], 'tapu-koko')
+
+    def test_trigram_matches(self):
+        """substrings and small typos are found through the trigram index."""
+
+        self.assertIn('charmander', self.names('mander'))
+        self.assertEqual(self.names('pikachoo')[0], 'pikachu')
+
+    def test_filters(self):
+        """type and generation filters."""
+
+        self.assertEqual(self.names('pi', type='electric'), ['pichu', 'pikachu'])
+        self.assertEqual(self.names('pi', generation=2), ['pichu'])
+        self.assertEqual(self.names('char', type='flying'), ['charizard'])
+
+    def test_limit_and_empty(self):
+        self.assertEqual(len(self.names('c', limit=2)), 2)
+        self.assertEqual(self.names(''), [])
+        self.assertEqual(self.names('zzzz'), [])
+
+    def test_holder_rebuilds(self):
+        """the holder only calls its loader again after clear() or once the ttl passes."""
+
+        now = [0]
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return ENTRIES
+
+        holder = SearchIndexHolder(loader, ttl=10, clock=lambda: now[0])
+
+        holder.get()
+        holder.get()
+        self.assertEqual(len(calls), 1)
+
+        holder.clear()
+        holder.get()
+        self.assertEqual(len(calls), 2)
+
+        now[0] = 11
+        holder.get()
+        self.assertEqual(len(calls), 3)
+
+    def test_known_names_recheck(self):
+        """unknown names should only reload the set once per recheck interval."""
+
+        now = [0]
+        names = ['pikachu']
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return list(names)
+
+        known = KnownNames(loader, ttl=600, recheck=60, clock=lambda: now[0])
+
+        self.assertIn('pikachu', known)
+        self.assertNotIn('missingno', known)
+        self.assertNotIn('missingno', known)
+        self.assertEqual(len(calls), 1)
+
+        # a pokemon added by another process shows up once the recheck interval has passed.
+        names.append('spoink')
+        now[0] = 61
+        self.assertIn('spoink', known)
+        self.assertEqual(len(calls), 2)
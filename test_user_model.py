@@ -1,18 +1,12 @@
 """unit tests for user model class ONLY"""
 
-from app import app
-import os
-from unittest import TestCase
+from testing import app, stub, national_dex_fixture, DatabaseTestCase
+import time
+import tracemalloc
 
-from models import db, User, Comment,  Pokemon
+from sqlalchemy import text
 
-os.environ['DATABASE_URL'] = "postgresql:///testing_db"
-
-db.drop_all()
-db.create_all()
-
-Pokemon.get_national_dex()
-db.session.commit()
+from models import db, User, Comment,  Pokemon, ActivityFeedEntry
 
 
 """
@@ -21,12 +15,14 @@ TODO:
     - add test for user model in the evne incorrect information is entered like a number in the image url section.
 """
 
-class UserModelTestCase(TestCase):
+class UserModelTestCase(DatabaseTestCase):
     """Testing user model ONLY"""
 
     def setUp(self):
         """Create test client before each test"""
 
+        super().setUp()
+
         User.query.delete()
         Comment.query.delete()
 
@@ -105,4 +101,170 @@ class UserModelTestCase(TestCase):
             image_url=None
         )
 
-        self.assertFalse(User.authenticate(u.username, 'Wrongpassword'))
\ No newline at end of file
+        self.assertFalse(User.authenticate(u.username, 'Wrongpassword'))
+
+    def test_get_national_dex_uses_client(self):
+        """re-seeding through the model should go through the shared (stubbed) PokeAPI client and keep every pokemon."""
+
+        before = Pokemon.query.count()
+
+        self.assertEqual(Pokemon.get_national_dex(), 'completed')
+        self.assertEqual(stub.requests['pokedex/national'], 1)
+        self.assertEqual(Pokemon.query.count(), before)
+
+    def test_upsert_national_dex(self):
+        """re-running the upsert should only write rows that are new or out of date, and never change ids or drop comments."""
+
+        entries = national_dex_fixture()
+
+        # the test database was seeded from the same fixture.
+        self.assertEqual(Pokemon.upsert_national_dex(entries), (0, 0))
+
+        user = User(email='upsert@testing.com', username='upserter', password='COMPLETELY_HASHED')
+        db.session.add(user)
+        db.session.commit()
+
+        db.session.add(Comment(text='still here', user_id=user.id, pokemon_id=25))
+        db.session.execute(text("UPDATE pokemon SET generation = 9 WHERE pokemon_name = 'pikachu'"))
+        db.session.execute(text("UPDATE pokemon SET front_shiny = NULL WHERE pokemon_name = 'bulbasaur'"))
+        db.session.execute(text("UPDATE pokemon SET front_default = 'ingested.png' WHERE pokemon_name = 'charmander'"))
+        db.session.commit()
+
+        self.assertEqual(Pokemon.upsert_national_dex(entries), (0, 2))
+        self.assertEqual(Pokemon.upsert_national_dex(entries), (0, 0))
+        db.session.commit()
+
+        pikachu = Pokemon.query.filter_by(pokemon_name='pikachu').one()
+        self.assertEqual((pikachu.id, pikachu.generation), (25, 1))
+        self.assertEqual([comment.text for comment in pikachu.comments], ['still here'])
+
+        self.assertIsNotNone(Pokemon.query.get(1).front_shiny)
+        self.assertEqual(Pokemon.query.get(4).front_default, 'ingested.png')
+        self.assertEqual(Pokemon.query.count(), len(entries))
+
+    def test_comment_counters(self):
+        """are the comment counters kept in step when comments are added and removed?"""
+
+        user = User(
+            email='counting@testing.com',
+            username='countinguser',
+            password='COMPLETELY_HASHED'
+        )
+
+        db.session.add(user)
+        db.session.commit()
+
+        bulbasaur = Pokemon.query.get(1)
+        pikachu = Pokemon.query.get(25)
+
+        comments = [Comment(text=f'comment {i}', user_id=user.id, pokemon_id=pikachu.id) for i in range(3)]
+        comments.append(Comment(text='grass', user_id=user.id, pokemon_id=bulbasaur.id))
+        db.session.add_all(comments)
+        db.session.commit()
+
+        self.assertEqual(user.comment_count, 4)
+        self.assertEqual(user.top_pokemon(), [('pikachu', 3), ('bulbasaur', 1)])
+
+        db.session.delete(comments[-1])
+        db.session.commit()
+
+        self.assertEqual(user.comment_count, 3)
+        self.assertEqual(user.top_pokemon(), [('pikachu', 3)])
+
+        page, cursor = user.comments_page(per_page=2)
+        self.assertEqual(len(page), 2)
+        self.assertEqual(page[0].pokemon.pokemon_name, 'pikachu')
+        self.assertIsNotNone(cursor)
+
+    def test_pokemon_counters_and_trending(self):
+        """do the pokemon counters and trending scores follow comments, including a deleted user's?"""
+
+        fans = [User(email=f'fan{i}@testing.com', username=f'fan{i}', password='COMPLETELY_HASHED') for i in range(2)]
+        db.session.add_all(fans)
+        db.session.commit()
+
+        bulbasaur = Pokemon.query.get(1)
+        pikachu = Pokemon.query.get(25)
+
+        db.session.add_all([Comment(text='pika', user_id=fans[0].id, pokemon_id=pikachu.id) for _ in range(2)])
+        db.session.add(Comment(text='pika pika', user_id=fans[1].id, pokemon_id=pikachu.id))
+        db.session.add(Comment(text='grass', user_id=fans[1].id, pokemon_id=bulbasaur.id))
+        db.session.commit()
+
+        self.assertEqual(pikachu.comment_count, 3)
+        self.assertEqual(bulbasaur.comment_count, 1)
+        self.assertIsNotNone(pikachu.last_comment_at)
+        self.assertEqual(fans[1].last_comment_at, bulbasaur.last_comment_at)
+
+        trending = Pokemon.trending()
+        self.assertEqual([pokemon.pokemon_name for pokemon, score in trending], ['pikachu', 'bulbasaur'])
+        self.assertAlmostEqual(trending[0][1], 3, places=2)
+
+        db.session.delete(fans[1])
+        db.session.commit()
+
+        self.assertEqual(pikachu.comment_count, 2)
+        self.assertEqual(bulbasaur.comment_count, 0)
+        self.assertIsNone(bulbasaur.last_comment_at)
+        self.assertEqual([pokemon.pokemon_name for pokemon, score in Pokemon.trending()], ['pikachu'])
+
+    def test_activity_feed(self):
+        """is every new comment in the feed, newest first, paged with a cursor and renamed with its user?"""
+
+        user = User(email='feed@testing.com', username='feeder', password='COMPLETELY_HASHED')
+        db.session.add(user)
+        db.session.commit()
+
+        for pokemon_id in (1, 4, 25):
+            db.session.add(Comment(text='hello', user_id=user.id, pokemon_id=pokemon_id))
+            db.session.commit()
+
+        page, cursor = ActivityFeedEntry.page(per_page=2)
+        self.assertEqual([entry.pokemon_name for entry in page], ['pikachu', 'charmander'])
+        self.assertEqual(page[0].username, 'feeder')
+
+        page, cursor = ActivityFeedEntry.page(before=Comment.parse_cursor(cursor), per_page=2)
+        self.assertEqual([entry.pokemon_name for entry in page], ['bulbasaur'])
+        self.assertIsNone(cursor)
+
+        user.username = 'renamed'
+        db.session.commit()
+        self.assertEqual({entry.username for entry in ActivityFeedEntry.page()[0]}, {'renamed'})
+
+        db.session.delete(user)
+        db.session.commit()
+        self.assertEqual(ActivityFeedEntry.page(), ([], None))
+
+    def test_delete_user_with_many_comments(self):
+        """deleting a heavy commenter should be left to the database cascade instead of loading every comment."""
+
+        user = User(
+            email='heavy@testing.com',
+            username='heavycommenter',
+            password='COMPLETELY_HASHED'
+        )
+
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        db.session.execute(text("""
+            INSERT INTO comments (text, timestamp, user_id, pokemon_id)
+            SELECT 'comment ' || n, now(), :user_id, (n % 151) + 1 FROM generate_series(1, 100000) AS n
+        """), {'user_id': user_id})
+        db.session.commit()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+
+        db.session.delete(user)
+        db.session.commit()
+
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        self.assertEqual(Comment.query.filter(Comment.user_id == user_id).count(), 0)
+        # loading 100k Comment objects would take far longer and hundreds of MB.
+        self.assertLess(seconds, 10)
+        self.assertLess(peak, 5 * 1024 * 1024)
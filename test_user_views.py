@@ -1,25 +1,18 @@
 """File is testing user views ONLY."""
 
-from app import app, CURR_USER_KEY
+from app import CURR_USER_KEY, user_cache
+from testing import app, stub, recorded_queries, DatabaseTestCase
+import json
 import os
 import re
-from unittest import TestCase
+from datetime import datetime, timedelta
 
 from models import db, connect_db, User, Comment, Pokemon
 from flask import get_flashed_messages, session
+from pokeapi_stub import FIXTURES_DIR
 
-os.environ['DATABASE_URL'] = "postgresql:///pokeapi_db"
 
-db.drop_all()
-db.create_all()
-
-Pokemon.get_national_dex()
-db.session.commit()
-
-app.config['WTF_CSRF_ENABLED'] = False
-
-
-class TestViewFunctions(TestCase):
+class TestViewFunctions(DatabaseTestCase):
     """Tests for different view functions from main application file."""
 
     def setup(self):
@@ -334,3 +327,204 @@ class TestViewFunctions(TestCase):
             self.assertEqual(res.status_code, 200)
             self.assertIn('Fire', html)
 
+
+    def test_pokemon_moves_view(self):
+        """the moves endpoint should return every move name from the recorded PokeAPI response."""
+
+        with open(os.path.join(FIXTURES_DIR, 'pokemon', 'charmander.json')) as f:
+            expected = [item['move']['name'] for item in json.load(f)['moves']]
+
+        with app.test_client() as client:
+            res = client.get('/pokemon/charmander/moves')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json['name'], 'charmander')
+        self.assertCountEqual(res.json['moves'], expected)
+
+    def test_pokemon_comments_pages(self):
+        """more than one page of comments should be split by the Older Comments cursor without skipping or repeating any, including comments with the same timestamp across the page boundary."""
+
+        user = User(email='pager@testing.com', username='pager', password='COMPLETELY_HASHED')
+        db.session.add(user)
+        db.session.commit()
+
+        # three comments per timestamp, so the last comment of the first page (comment-05) shares its timestamp with the first two of the next one.
+        start = datetime(2022, 1, 1)
+        for number in range(25):
+            db.session.add(Comment(text=f'comment-{number:02}', user_id=user.id, pokemon_id=25, timestamp=start + timedelta(minutes=number // 3)))
+            db.session.flush()
+        db.session.commit()
+
+        with app.test_client() as client:
+            html = client.get('/pokemon/pikachu/detail').get_data(as_text=True)
+
+            self.assertEqual([number for number in range(25) if f'comment-{number:02}' in html], list(range(5, 25)))
+
+            older = re.search(r'href="(/pokemon/pikachu/detail\?before=[^"]+)"[^>]*>Older Comments', html)
+            self.assertIsNotNone(older)
+
+            html = client.get(older.group(1)).get_data(as_text=True)
+
+            self.assertEqual([number for number in range(25) if f'comment-{number:02}' in html], list(range(5)))
+            self.assertNotIn('Older Comments', html)
+
+    def test_trending_view(self):
+        """the most commented pokemon should be listed on /trending."""
+
+        user = User(email='trend@testing.com', username='trendsetter', password='COMPLETELY_HASHED')
+        db.session.add(user)
+        db.session.commit()
+
+        db.session.add(Comment(text='electric!', user_id=user.id, pokemon_id=25))
+        db.session.commit()
+
+        with app.test_client() as client:
+            res = client.get('/trending')
+            html = res.get_data(as_text=True)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Pikachu', html)
+            self.assertIn('1 comments', html)
+
+    def test_activity_feed_view(self):
+        """new comments should show up on /feed with who made them and on which pokemon."""
+
+        user = User(email='feedview@testing.com', username='feedviewer', password='COMPLETELY_HASHED')
+        db.session.add(user)
+        db.session.commit()
+
+        db.session.add(Comment(text='flame on', user_id=user.id, pokemon_id=4))
+        db.session.commit()
+
+        with app.test_client() as client:
+            res = client.get('/feed')
+            html = res.get_data(as_text=True)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('feedviewer', html)
+            self.assertIn('Charmander', html)
+
+    def test_unknown_pokemon_is_404(self):
+        """made up pokemon names should be a 404 on every pokemon route without calling PokeAPI."""
+
+        with app.test_client() as client:
+            self.assertEqual(client.get('/pokemon/pikachoo/detail').status_code, 404)
+            self.assertEqual(client.get('/pokemon/pikachoo/moves').status_code, 404)
+
+        self.assertEqual(sum(stub.requests.values()), 0)
+
+    def test_pokemon_missing_upstream(self):
+        """a known pokemon that PokeAPI has no entry for should still get a page, and PokeAPI should only be asked once."""
+
+        with app.test_client() as client:
+            res = client.get('/pokemon/ivysaur/detail')
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('Ivysaur', res.get_data(as_text=True))
+
+            self.assertEqual(client.get('/pokemon/ivysaur/moves').status_code, 404)
+
+        self.assertEqual(stub.requests['pokemon/ivysaur'], 1)
+
+    def test_pokemon_details_upstream_down(self):
+        """with PokeAPI down and nothing cached the page should still render, and must not be cacheable by a proxy or the browser."""
+
+        stub.status = 503
+
+        try:
+            with app.test_client() as client:
+                res = client.get('/pokemon/bulbasaur/detail')
+        finally:
+            stub.status = None
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('temporarily unavailable', res.get_data(as_text=True))
+        self.assertEqual(res.headers['Cache-Control'], 'no-store')
+        self.assertNotIn('ETag', res.headers)
+
+    def test_pokedex_view_is_local(self):
+        """regional pokedex pages are served from the database, unknown names are a 404, and neither calls PokeAPI."""
+
+        with app.test_client() as client:
+            self.assertEqual(client.get('/pokedex-generations/hoenn').status_code, 200)
+            self.assertEqual(client.get('/pokedex-generations/not-a-pokedex').status_code, 404)
+
+        self.assertEqual(sum(stub.requests.values()), 0)
+
+    def test_session_user_not_loaded_when_unused(self):
+        """json and redirect routes that never read g.user should not query the users table."""
+
+        user = User.signup('lazyloader', 'lazy@testing.com', 'lazyloader1', None)
+        db.session.commit()
+
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess[CURR_USER_KEY] = user.id
+
+            with recorded_queries('users') as queries:
+                self.assertEqual(client.get('/search?q=char').status_code, 200)
+                self.assertEqual(client.get('/search/go?q=charmander').status_code, 302)
+
+        self.assertEqual(queries, [])
+        self.assertNotIn(user.id, user_cache)
+
+    def test_session_user_cached_between_requests(self):
+        """the first page loads the logged in user, the next one should get g.user from user_cache without a query."""
+
+        user = User.signup('cacheduser', 'cached@testing.com', 'cacheduser1', None)
+        db.session.commit()
+
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess[CURR_USER_KEY] = user.id
+
+            with recorded_queries('users') as queries:
+                self.assertIn('cacheduser', client.get('/pokedex-generations').get_data(as_text=True))
+
+            self.assertEqual(len(queries), 1)
+            self.assertIn(user.id, user_cache)
+
+            with recorded_queries('users') as queries:
+                self.assertIn('cacheduser', client.get('/pokedex-generations').get_data(as_text=True))
+
+            self.assertEqual(queries, [])
+
+    def test_edit_profile_evicts_cached_user(self):
+        """after a profile edit the cached copy should be dropped so the next page shows the new username."""
+
+        user = User.signup('beforeedit', 'edit@testing.com', 'beforeedit1', None)
+        db.session.commit()
+
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess[CURR_USER_KEY] = user.id
+
+            client.get('/pokedex-generations')
+            self.assertIn(user.id, user_cache)
+
+            data = {'username': 'afteredit', 'email': 'edit@testing.com', 'password': 'beforeedit1', 'image_url': ''}
+            self.assertEqual(client.post('/users/edit', data=data).status_code, 302)
+            self.assertNotIn(user.id, user_cache)
+
+            html = client.get('/pokedex-generations').get_data(as_text=True)
+            self.assertIn('afteredit', html)
+            self.assertNotIn('beforeedit', html)
+
+    def test_delete_user_evicts_cached_user(self):
+        """a user deleted through the cached g.user should be gone from the database and from user_cache."""
+
+        user = User.signup('shortlived', 'gone@testing.com', 'shortlived1', None)
+        db.session.commit()
+        user_id = user.id
+
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess[CURR_USER_KEY] = user_id
+
+            client.get('/pokedex-generations')
+            self.assertIn(user_id, user_cache)
+
+            self.assertEqual(client.post('/users/delete').status_code, 302)
+
+        self.assertNotIn(user_id, user_cache)
+        self.assertIsNone(User.query.get(user_id))
+
@@ -0,0 +1,84 @@
+"""tests for the background cache warmer ONLY. The names and warm functions are plain fakes, no database or PokeAPI is needed."""
+
+import threading
+import time
+from unittest import TestCase
+
+from warmer import CacheWarmer
+
+
+class CacheWarmerTestCase(TestCase):
+    """testing the order, limits and concurrency of a warming round."""
+
+    def test_warms_names_in_order(self):
+        """every name should be warmed, in the order they were returned, and only `limit` of them."""
+
+        warmed = []
+        limits = []
+
+        def names(limit):
+            limits.append(limit)
+            return ['pikachu', 'charmander', 'bulbasaur'][:limit]
+
+        warmer = CacheWarmer(names, lambda name: warmed.append(name) or True, limit=2, concurrency=1)
+
+        self.assertEqual(warmer.run_once(), 2)
+        self.assertEqual(warmed, ['pikachu', 'charmander'])
+        self.assertEqual(limits, [2])
+
+    def test_concurrency_limit(self):
+        """no more than `concurrency` pokemon should be loaded at the same time."""
+
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def warm(name):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return True
+
+        warmer = CacheWarmer(lambda limit: [str(n) for n in range(20)], warm, concurrency=3)
+        warmer.run_once()
+
+        self.assertLessEqual(peak[0], 3)
+        self.assertEqual(warmer.stats['warmed'], 20)
+
+    def test_skips_and_failures_counted(self):
+        """cached names and errors should not stop the round."""
+
+        def warm(name):
+            if name == 'missingno':
+                raise ValueError(name)
+            return name != 'pikachu'
+
+        warmer = CacheWarmer(lambda limit: ['pikachu', 'missingno', 'eevee'], warm, concurrency=1)
+
+        self.assertEqual(warmer.run_once(), 1)
+        self.assertEqual(warmer.stats['skipped'], 1)
+        self.assertEqual(warmer.stats['failed'], 1)
+
+    def test_paused(self):
+        """nothing should be loaded while the upstream is failing."""
+
+        warmed = []
+        warmer = CacheWarmer(lambda limit: ['pikachu'], warmed.append, paused=lambda: True)
+
+        self.assertEqual(warmer.run_once(), 0)
+        self.assertEqual(warmed, [])
+
+    def test_start_runs_first_round(self):
+        """the background thread should warm once right away and stop cleanly."""
+
+        done = threading.Event()
+        warmer = CacheWarmer(lambda limit: ['pikachu'], lambda name: done.set() or True, interval=60)
+
+        warmer.start()
+        self.assertTrue(done.wait(5))
+        warmer.stop()
+
+        self.assertEqual(warmer.stats['warmed'], 1)
@@ -0,0 +1,174 @@
+"""shared setup for the database backed tests (test_user_model.py, test_user_views.py, test_pokemon_user_routes.py).
+
+* one app per test process, built with the testing config. When the suite runs in parallel (`python -m pytest -n auto`) every pytest-xdist worker gets a database of its own: testing_db_gw0, testing_db_gw1, ...
+* PokeAPI is replaced by a `PokeAPIStub` serving the recorded responses in fixtures/, so no test needs the network.
+* the schema and the pokedex fixtures are created once per process. Every test then runs inside a transaction that is rolled back when it finishes; commits made by the views only release a SAVEPOINT.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from unittest import TestCase
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import scoped_session
+
+from app import create_app, known_pokemon, search_index, user_cache
+from config import TestingConfig
+from models import db, Pokedex, Pokemon
+import passwords
+import pokeapi
+import responses
+from pokeapi_stub import FIXTURES_DIR, PokeAPIStub
+
+WORKER = os.environ.get('PYTEST_XDIST_WORKER')
+
+
+def worker_database_url(url):
+    """returns url with the pytest-xdist worker id added to the database name (testing_db -> testing_db_gw0), leaving the host and query string alone."""
+
+    if not WORKER:
+        return url
+
+    url = make_url(url)
+    url.database = f'{url.database}_{WORKER}'
+    return str(url)
+
+
+class WorkerTestingConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = worker_database_url(TestingConfig.SQLALCHEMY_DATABASE_URI)
+
+
+app = create_app(WorkerTestingConfig)
+
+stub = PokeAPIStub.from_fixtures()
+
+_ready = False
+
+
+def create_database(url):
+    """creates the database in url when it does not exist yet."""
+
+    url = make_url(url)
+    name = url.database
+    url.database = 'postgres'
+
+    engine = create_engine(url, isolation_level='AUTOCOMMIT')
+
+    with engine.connect() as connection:
+        if not connection.execute(text('SELECT 1 FROM pg_database WHERE datname = :name'), name=name).scalar():
+            connection.execute(text(f'CREATE DATABASE "{name}"'))
+
+    engine.dispose()
+
+
+def national_dex_fixture():
+    """returns the (national id, name) pairs of the recorded national pokedex."""
+
+    with open(os.path.join(FIXTURES_DIR, 'pokedex', 'national.json')) as f:
+        return [(item['entry_number'], item['pokemon_species']['name']) for item in json.load(f)['pokemon_entries']]
+
+
+def setup_test_environment():
+    """starts the PokeAPI stub and builds a fresh schema with the pokedex fixtures, once per process."""
+
+    global _ready
+
+    if _ready:
+        return
+
+    # real work factors would make every signup / login in the tests take a large part of a second.
+    passwords.BCRYPT_LOG_ROUNDS = 4
+    passwords.BCRYPT_POOL_SIZE = 0
+
+    stub.start()
+    pokeapi.client.base_url = stub.url
+
+    create_database(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        Pokemon.upsert_national_dex(national_dex_fixture())
+
+        for filename in os.listdir(os.path.join(FIXTURES_DIR, 'pokedex')):
+            if filename != 'national.json':
+                with open(os.path.join(FIXTURES_DIR, 'pokedex', filename)) as f:
+                    Pokedex.store(json.load(f))
+
+        db.session.commit()
+
+    _ready = True
+
+
+class TestScopedSession(scoped_session):
+    """keeps handing out the one session that is joined to the test's transaction."""
+
+    def remove(self):
+        # flask-sqlalchemy removes the session at the end of every request. Closing it here would also end the SAVEPOINT, so only the objects are let go, like a real request would.
+        if self.registry.has():
+            self.registry().expunge_all()
+
+
+class DatabaseTestCase(TestCase):
+    """runs every test in a transaction that is rolled back afterwards, with the caches that outlive a request emptied."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        setup_test_environment()
+
+    def setUp(self):
+        super().setUp()
+
+        self.connection = db.engine.connect()
+        self.transaction = self.connection.begin()
+
+        session = db.create_session({'bind': self.connection, 'binds': {}})()
+        session.begin_nested()
+
+        @event.listens_for(session, 'after_transaction_end')
+        def restart_savepoint(session, transaction):
+            if transaction.nested and not transaction._parent.nested:
+                session.expire_all()
+                session.begin_nested()
+
+        self._original_session = db.session
+        db.session = TestScopedSession(lambda: session)
+
+        user_cache.clear()
+        responses.fragment_cache.clear()
+        search_index.clear()
+        known_pokemon.clear()
+        pokeapi.client.cache.clear()
+        pokeapi.client.missing.clear()
+        stub.requests.clear()
+
+    def tearDown(self):
+        db.session.registry().close()
+        db.session = self._original_session
+
+        self.transaction.rollback()
+        self.connection.close()
+
+        super().tearDown()
+
+
+@contextmanager
+def recorded_queries(table):
+    """collects the SQL statements that select from table while the block runs."""
+
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if f'FROM {table}' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
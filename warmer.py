@@ -0,0 +1,100 @@
+"""background cache warmer for the pokemon detail pages.
+
+Once when the worker starts and then every `interval` seconds, the warmer asks for the pokemon with the most recent comment activity and loads each one's record into the PokeAPI cache, so the first visitor after a deploy (or after an entry expires) does not wait on pokeapi.co.
+
+The work is kept small on purpose:
+
+* at most `concurrency` pokemon are loaded at the same time, and only `limit` per round.
+* entries that are cached and not close to expiry are skipped by the `warm` function, so a round after the first one mostly only touches what is about to expire.
+* a round stops early while `paused()` is true (the PokeAPI circuit breaker is open).
+
+Settings (environment variables): `CACHE_WARMER` turns it on, `CACHE_WARMER_INTERVAL`, `CACHE_WARMER_LIMIT` and `CACHE_WARMER_CONCURRENCY` tune it."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+
+class CacheWarmer:
+    """calls `warm(name)` for every name returned by `names(limit)`.
+
+    `context` returns the context manager each call runs in (an app context for the real application), `warm` returns True when it actually loaded something."""
+
+    def __init__(self, names, warm, interval=60 * 15, limit=200, concurrency=2, context=nullcontext, paused=lambda: False):
+        self.names = names
+        self.warm = warm
+        self.interval = interval
+        self.limit = limit
+        self.concurrency = concurrency
+        self.context = context
+        self.paused = paused
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            'rounds': 0,
+            'warmed': 0,
+            'skipped': 0,
+            'failed': 0,
+            'last_round_seconds': 0.0,
+        }
+
+    def run_once(self):
+        """warms one round of pokemon and returns how many were loaded."""
+
+        start = time.perf_counter()
+
+        with self.context():
+            names = self.names(self.limit)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='cache-warmer') as executor:
+            results = list(executor.map(self._warm_one, names))
+
+        warmed = results.count(True)
+
+        self.stats['rounds'] += 1
+        self.stats['warmed'] += warmed
+        self.stats['skipped'] += results.count(False)
+        self.stats['failed'] += results.count(None)
+        self.stats['last_round_seconds'] = time.perf_counter() - start
+
+        return warmed
+
+    def _warm_one(self, name):
+        if self._stop.is_set() or self.paused():
+            return False
+
+        try:
+            with self.context():
+                return bool(self.warm(name))
+        except Exception:
+            return None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # a failed round (database restarting, ...) is retried on the next one.
+                self.stats['failed'] += 1
+
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """starts warming on a daemon thread, the first round right away. Calling it again while running does nothing."""
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='cache-warmer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None